@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -57,6 +58,9 @@ MIDDLEWARE = [
     'users.middleware.TimezoneMiddleware',
 ]
 
+# Cache-Control of the html responses whose view does not set one (see users/middleware.py)
+HTML_CACHE_CONTROL = 'no-store'
+
 ROOT_URLCONF = 'graduation_project.urls'
 
 TEMPLATES = [
@@ -90,6 +94,54 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # rendered question cards, see practice/question_cards.py
+    'question_cards': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'question_cards',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+# several processes/servers share the cards through a directory
+if os.environ.get('PRACTICE_QUESTION_CARD_CACHE_DIR'):
+    CACHES['question_cards'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['PRACTICE_QUESTION_CARD_CACHE_DIR'],
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    }
+
+# counters read by management commands (render and cache statistics) must be seen by every process:
+# a directory shared by the processes of a server (PRACTICE_STATS_CACHE_DIR), never a local memory cache
+CACHES['practice_stats'] = {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.environ.get('PRACTICE_STATS_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'graduation_project_stats')),
+}
+
+PRACTICE_QUESTION_CARD_CACHE_ALIAS = 'question_cards'
+PRACTICE_QUESTION_CARD_STATS_CACHE_ALIAS = 'practice_stats'
+# Seconds a rendered question card is kept (0 to always render)
+PRACTICE_QUESTION_CARD_CACHE_TIMEOUT = 3600
+
+# Largest page of practice:api_view_questions
+PRACTICE_API_MAX_LIMIT = 10000
+
+# Seconds a cached count of a listing page may be served (0 to always count), see practice/count_cache.py
+PRACTICE_COUNT_CACHE_TIMEOUT = 60
+# the versions of the models must be bumped for every process (see practice/count_cache.py)
+PRACTICE_COUNT_CACHE_ALIAS = 'practice_stats'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -142,6 +194,38 @@ MEDIA_URL = 'media/'
 
 TMP_MEDIA_URL = MEDIA_URL + 'tmp/'
 
+# Files of questions are served by practice.views.view_question_media, see practice/media.py
+# '' (the WSGI server sends the file), 'x-accel' (nginx) or 'x-sendfile' (apache mod_xsendfile, lighttpd)
+PRACTICE_MEDIA_OFFLOAD = ''
+# internal nginx location aliased to MEDIA_ROOT, for 'x-accel'
+PRACTICE_MEDIA_OFFLOAD_PREFIX = '/protected-media/'
+# new files of questions are named by the SHA-256 of their content and stored once (MEDIA_ROOT/blobs)
+PRACTICE_MEDIA_CONTENT_ADDRESSED = True
+
+# Rendered LaTeX images are cached in TMP_MEDIA_ROOT/latex, see practice/latex.py
+PRACTICE_LATEX_CACHE_MAX_SIZE = 256 * 1024 * 1024
+# renders run in PRACTICE_LATEX_WORKERS threads per server process, at most PRACTICE_LATEX_MAX_QUEUED jobs wait
+PRACTICE_LATEX_WORKERS = 2
+PRACTICE_LATEX_MAX_QUEUED = 32
+# seconds a render may take, seconds a failed render is remembered
+PRACTICE_LATEX_TIMEOUT = 10
+PRACTICE_LATEX_FAILURE_TTL = 300
+# the preamble is precompiled into a format file (in PRACTICE_LATEX_FORMAT_ROOT, a temporary directory by default)
+PRACTICE_LATEX_PREAMBLE_FORMAT = True
+# renderers tried in order, 'mathtext' needs matplotlib and only renders simple inline formulas
+PRACTICE_LATEX_RENDERERS = ['mathtext', 'latex']
+PRACTICE_LATEX_STATS_CACHE_ALIAS = 'practice_stats'
+
+# Preview files in TMP_MEDIA_ROOT are removed by the sweep_tmp_media command (or a thread every
+# PRACTICE_TMP_MEDIA_SWEEP_INTERVAL seconds if it is not 0): after PRACTICE_TMP_MEDIA_MAX_AGE seconds,
+# and the oldest ones above PRACTICE_TMP_MEDIA_USER_MAX_SIZE bytes per user or PRACTICE_TMP_MEDIA_MAX_SIZE bytes in total
+PRACTICE_TMP_MEDIA_MAX_AGE = 24 * 3600
+PRACTICE_TMP_MEDIA_USER_MAX_SIZE = 100 * 1024 * 1024
+PRACTICE_TMP_MEDIA_MAX_SIZE = 2 * 1024 * 1024 * 1024
+PRACTICE_TMP_MEDIA_SWEEP_INTERVAL = 0
+# largest chunk of a resumable upload of question media (practice/uploads.py), in bytes
+PRACTICE_UPLOAD_MAX_CHUNK_SIZE = 2 * 1024 * 1024
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
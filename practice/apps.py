@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
+from django.db.models.signals import post_migrate
 
 
 class PracticeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'practice'
+
+    def ready(self):
+        # connect signal receivers
+        from . import signals
+        post_migrate.connect(signals.create_question_search_index, sender=self)
+
+        # the sweeper of TMP_MEDIA_ROOT runs in server processes only, not in management commands
+        from . import tmp_media
+        if tmp_media.get_sweep_interval():
+            request_started.connect(tmp_media.start_sweeper, dispatch_uid='practice.tmp_media.start_sweeper')
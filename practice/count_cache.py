@@ -0,0 +1,68 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Counts of the listing pages (only used to draw the page links) are cached by the signature of their query.
+# A cached count is dropped when a model it depends on is saved or deleted (its version is bumped once the write is
+# committed, see practice.signals), writes which bypass the signals (e.g. QuerySet.update) are only seen after PRACTICE_COUNT_CACHE_TIMEOUT seconds.
+# The versions are bumped by the process which writes, so PRACTICE_COUNT_CACHE_ALIAS must be a cache shared by the
+# processes of the server (never a local memory cache) or the other processes keep serving their stale counts.
+
+
+def get_cache():
+    return caches[getattr(settings, 'PRACTICE_COUNT_CACHE_ALIAS', 'practice_stats')]
+
+
+def get_timeout():
+    return getattr(settings, 'PRACTICE_COUNT_CACHE_TIMEOUT', 60)
+
+
+def get_version_key(model):
+    return f'practice.count_cache.version:{model._meta.label_lower}'
+
+
+def bump_version(model):
+    cache = get_cache()
+    key = get_version_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # versions never expire, or a cached count could be served again after a write
+        cache.add(key, 1, timeout=None)
+
+
+def get_signature(queryset, depends_on):
+    """
+    The canonical form of a filter set is the SQL (with its parameters) it is compiled to,
+    so the signature covers the filters and sorters of the session as well as the filters of the view (state, user, tag...).
+    """
+    cache = get_cache()
+    version_keys = [get_version_key(model) for model in depends_on]
+    versions = cache.get_many(version_keys)
+    sql, params = queryset.query.sql_with_params()
+    signature = json.dumps({
+        'sql': sql,
+        'params': params,
+        'versions': [versions.get(key, 0) for key in version_keys],
+    }, default=str, ensure_ascii=False)
+    return hashlib.sha256(signature.encode('utf-8')).hexdigest()
+
+
+def get_count(queryset, depends_on):
+    """
+    Returns queryset.count(), from the cache if it has been counted in the last PRACTICE_COUNT_CACHE_TIMEOUT seconds
+    and no model of depends_on has been written since.
+    """
+    timeout = get_timeout()
+    if not timeout:
+        return queryset.count()
+
+    cache = get_cache()
+    key = f'practice.count_cache.count:{get_signature(queryset, depends_on)}'
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout=timeout)
+    return count
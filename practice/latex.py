@@ -0,0 +1,581 @@
+import hashlib
+import json
+import math
+import os
+import pathlib
+import re
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import caches
+from sympy.printing.preview import _get_latex_main
+
+from .stats import increase_stat
+
+# LaTeX contents of the questions are rendered to PNG with latex + dvipng (the document of sympy.preview).
+# Renders are cached on disk by the hash of (content, preamble, RENDERER_VERSION): the preview and the submit of
+# process_new_question, and users typing the same formula, share one render and a hit does not start the subprocesses.
+# Files are content addressed, TMP_MEDIA_ROOT/latex/<2 first hex digits>/<sha256>.png, and written with an atomic rename,
+# so concurrent renders of a formula can not expose a partial file.
+# A hit touches the mtime of its file, the least recently used files are evicted above PRACTICE_LATEX_CACHE_MAX_SIZE bytes.
+#
+# Renders are jobs run outside of the request by a pool of PRACTICE_LATEX_WORKERS threads per server process,
+# at most PRACTICE_LATEX_MAX_QUEUED jobs wait, each subprocess is killed after PRACTICE_LATEX_TIMEOUT seconds.
+# The id of a job is the key of its content, its state is in the cache directory so that every server process sees it:
+#   <key>.png     done
+#   <key>.err     failed (the error code), for PRACTICE_LATEX_FAILURE_TTL seconds, then the job can run again
+#   <key>.pending submitted, until it is done or failed. It holds 'queued' until a worker starts the job, then 'running'
+#                 (and its mtime is touched); a job is taken over when its marker is older than its process could keep it:
+#                 twice PRACTICE_LATEX_TIMEOUT once running, the wait of a full queue before (see get_pending_ttl).
+#                 The jobs of the server process are known without their marker (_jobs).
+#
+# With PRACTICE_LATEX_PREAMBLE_FORMAT, the preamble (with the \DeclareUnicodeCharacter of the Vietnamese letters) is dumped once into a
+# format file in PRACTICE_LATEX_FORMAT_ROOT and each render only compiles the body of its document with that format.
+# Renders fall back to compiling the whole document when the format can not be dumped or does not load.
+#
+# A render is made by the first renderer of PRACTICE_LATEX_RENDERERS which supports the content: 'mathtext' (matplotlib,
+# in process, simple inline formulas) then 'latex'. The renders, their duration and the fallbacks (with their reason)
+# of each renderer are counted in CACHES[PRACTICE_LATEX_STATS_CACHE_ALIAS], see the latex_render_stats command.
+
+# bumped when the rendering (preamble, options, latex setup) changes, older renders are then never looked up again
+RENDERER_VERSION = 2
+
+EXTRA_PREAMBLE = ("\\usepackage[utf8]{inputenc}\n"
+                  "\\DeclareUnicodeCharacter{1EA0}{\\text{A}}"
+                  "\\DeclareUnicodeCharacter{1EA1}{\\text{a}}"
+
+                  "\\DeclareUnicodeCharacter{1EA2}{\\text{A}}"
+                  "\\DeclareUnicodeCharacter{1EA3}{\\text{a}}"
+
+                  "\\DeclareUnicodeCharacter{1EA4}{\\text{A}}"
+                  "\\DeclareUnicodeCharacter{1EA5}{\\text{a}}"
+
+                  "\\DeclareUnicodeCharacter{1EAE}{\\text{A}}"
+                  "\\DeclareUnicodeCharacter{1EE5}{\\text{u}}"
+
+                  "\\DeclareUnicodeCharacter{1EE6}{\\text{U}}"
+                  "\\DeclareUnicodeCharacter{1EE7}{\\text{u}}"
+
+                  "\\DeclareUnicodeCharacter{01AF}{\\text{U}}"
+                  "\\DeclareUnicodeCharacter{01B0}{\\text{u}}"
+
+                  "\\DeclareUnicodeCharacter{1EE8}{\\text{U}}"
+                  "\\DeclareUnicodeCharacter{1EE9}{\\text{u}}"
+
+                  "\\DeclareUnicodeCharacter{1EEA}{\\text{U}}"
+                  "\\DeclareUnicodeCharacter{1EEB}{\\text{u}}"
+
+                  "\\DeclareUnicodeCharacter{1EEC}{\\text{U}}"
+                  "\\DeclareUnicodeCharacter{1EED}{\\text{u}}"
+
+                  "\\DeclareUnicodeCharacter{1EEE}{\\text{U}}"
+                  "\\DeclareUnicodeCharacter{1EEF}{\\text{u}}"
+
+                  "\\DeclareUnicodeCharacter{1EF0}{\\text{U}}"
+                  "\\DeclareUnicodeCharacter{1EF1}{\\text{u}}"
+
+                  "\\DeclareUnicodeCharacter{1EF4}{\\text{Y}}"
+                  "\\DeclareUnicodeCharacter{1EF5}{\\text{y}}"
+
+                  "\\DeclareUnicodeCharacter{1EF6}{\\text{Y}}"
+                  "\\DeclareUnicodeCharacter{1EF7}{\\text{y}}"
+
+                  "\\DeclareUnicodeCharacter{1EF8}{\\text{Y}}"
+                  "\\DeclareUnicodeCharacter{1EF9}{\\text{y}}"
+                  )
+
+CACHE_DIRNAME = 'latex'
+JOB_ID_LENGTH = 64
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+# error codes of the failed jobs
+SYNTAX_ERROR = 'syntax'
+TIMEOUT_ERROR = 'timeout'
+BUSY_ERROR = 'busy'
+UNKNOWN_ERROR = 'error'
+# TeX prints the errors of a document as '! <message>', a format which can not be loaded fails before any
+TEX_ERROR_PATTERN = re.compile(r'^! ', re.MULTILINE)
+
+
+class RenderError(Exception):
+    def __init__(self, code, output=''):
+        super().__init__(output or code)
+        self.code = code
+        self.output = output
+
+
+def get_cache_root():
+    return pathlib.Path(settings.TMP_MEDIA_ROOT, CACHE_DIRNAME)
+
+
+def get_max_size():
+    return getattr(settings, 'PRACTICE_LATEX_CACHE_MAX_SIZE', 256 * 1024 * 1024)
+
+
+def get_timeout():
+    return getattr(settings, 'PRACTICE_LATEX_TIMEOUT', 10)
+
+
+def get_failure_ttl():
+    return getattr(settings, 'PRACTICE_LATEX_FAILURE_TTL', 300)
+
+
+def get_workers():
+    return getattr(settings, 'PRACTICE_LATEX_WORKERS', 2)
+
+
+def get_max_queued():
+    return getattr(settings, 'PRACTICE_LATEX_MAX_QUEUED', 32)
+
+
+QUEUED_MARKER = 'queued'
+RUNNING_MARKER = 'running'
+
+
+def get_pending_ttl(marker):
+    """
+    Returns the seconds a .pending marker holding marker stays alive after its last write.
+    A queued job waits at most for the jobs queued before it in its process, PRACTICE_LATEX_TIMEOUT seconds each.
+    """
+    if marker == RUNNING_MARKER:
+        return 2 * get_timeout()
+    return (math.ceil(get_max_queued() / get_workers()) + 2) * get_timeout()
+
+
+def get_key(content):
+    signature = json.dumps([RENDERER_VERSION, EXTRA_PREAMBLE, content], ensure_ascii=False)
+    return hashlib.sha256(signature.encode('utf-8')).hexdigest()
+
+
+def is_job_id(job_id):
+    return len(job_id) == JOB_ID_LENGTH and all(c in '0123456789abcdef' for c in job_id)
+
+
+def get_filename(key, suffix='.png'):
+    # relative to TMP_MEDIA_ROOT (and TMP_MEDIA_URL)
+    return f'{CACHE_DIRNAME}/{key[:2]}/{key}{suffix}'
+
+
+def get_pathname(key, suffix='.png'):
+    return pathlib.Path(settings.TMP_MEDIA_ROOT, get_filename(key, suffix))
+
+
+def run(command, cwd, deadline):
+    try:
+        return subprocess.run(command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              timeout=max(deadline - time.monotonic(), 0))
+    except subprocess.TimeoutExpired:
+        raise RenderError(TIMEOUT_ERROR)
+    except OSError as e:
+        # latex or dvipng is not installed
+        raise RenderError(UNKNOWN_ERROR, str(e))
+
+
+def get_document(content):
+    """
+    Returns (preamble, body) of the document of content, the preamble is the same for every content.
+    """
+    latex_main = _get_latex_main(content, euler=False, extra_preamble=EXTRA_PREAMBLE)
+    preamble, begin_document, body = latex_main.partition('\\begin{document}')
+    return preamble, begin_document + body
+
+
+def get_format_root():
+    return pathlib.Path(getattr(settings, 'PRACTICE_LATEX_FORMAT_ROOT', pathlib.Path(tempfile.gettempdir(), 'practice_latex_format')))
+
+
+def get_format_name():
+    # a new format is dumped when the preamble or the rendering changes
+    preamble, _ = get_document('')
+    return f"preamble_{hashlib.sha256(f'{RENDERER_VERSION}{preamble}'.encode('utf-8')).hexdigest()[:16]}"
+
+
+_format_lock = threading.Lock()
+_format_failed_at = None
+
+
+def build_format():
+    """
+    Dumps the preamble into the format file <format root>/<format name>.fmt (latex -ini ... \\dump),
+    returns its pathname or None if latex can not dump it (it is then not tried again for PRACTICE_LATEX_FAILURE_TTL seconds).
+    """
+    global _format_failed_at
+    pathname = pathlib.Path(get_format_root(), f'{get_format_name()}.fmt')
+    if pathname.exists():
+        return pathname
+    with _format_lock:
+        if pathname.exists():
+            return pathname
+        if _format_failed_at is not None and time.monotonic() - _format_failed_at < get_failure_ttl():
+            return None
+        preamble, _ = get_document('')
+        name = get_format_name()
+        try:
+            with tempfile.TemporaryDirectory() as workdir:
+                pathlib.Path(workdir, 'preamble.tex').write_text(f'{preamble}\n\\dump\n', encoding='utf-8')
+                result = run(['latex', '-ini', '-halt-on-error', '-interaction=nonstopmode', f'-jobname={name}', '&latex', 'preamble.tex'],
+                             workdir, time.monotonic() + 6 * get_timeout())
+                if result.returncode:
+                    raise RenderError(UNKNOWN_ERROR, result.stdout.decode('utf-8', 'replace'))
+                pathname.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(pathlib.Path(workdir, f'{name}.fmt'), pathname)
+        except (RenderError, OSError):
+            _format_failed_at = time.monotonic()
+            return None
+        _format_failed_at = None
+        return pathname
+
+
+def drop_format():
+    try:
+        os.remove(pathlib.Path(get_format_root(), f'{get_format_name()}.fmt'))
+    except FileNotFoundError:
+        pass
+
+
+def run_latex(workdir, deadline, format_pathname=None):
+    """
+    Compiles workdir/texput.tex to texput.dvi, with the format format_pathname if given, raises RenderError.
+    """
+    command = ['latex', '-halt-on-error', '-interaction=nonstopmode', 'texput.tex']
+    if format_pathname:
+        # the format is looked up in the working directory
+        os.symlink(format_pathname, pathlib.Path(workdir, format_pathname.name))
+        command.insert(1, f'-fmt={format_pathname.stem}')
+    result = run(command, workdir, deadline)
+    if result.returncode:
+        raise RenderError(SYNTAX_ERROR, result.stdout.decode('utf-8', 'replace'))
+
+
+def render_to_file(content, pathname, using_format=None):
+    """
+    Renders content to the PNG pathname in at most PRACTICE_LATEX_TIMEOUT seconds, raises RenderError.
+    using_format (default PRACTICE_LATEX_PREAMBLE_FORMAT): only the body of the document is compiled, with the preamble
+    loaded from its precompiled format instead of parsed again, the whole document is compiled when there is no format.
+    """
+    if using_format is None:
+        using_format = getattr(settings, 'PRACTICE_LATEX_PREAMBLE_FORMAT', True)
+    deadline = time.monotonic() + get_timeout()
+    preamble, body = get_document(content)
+    format_pathname = build_format() if using_format else None
+    with tempfile.TemporaryDirectory() as workdir:
+        tex_pathname = pathlib.Path(workdir, 'texput.tex')
+        compiled = False
+        if format_pathname:
+            tex_pathname.write_text(body, encoding='utf-8')
+            try:
+                run_latex(workdir, deadline, format_pathname)
+                compiled = True
+            except RenderError as e:
+                # an error of the content fails the same way without the format, only a format error is retried
+                if e.code != SYNTAX_ERROR or TEX_ERROR_PATTERN.search(e.output):
+                    raise
+        if not compiled:
+            tex_pathname.write_text(preamble + body, encoding='utf-8')
+            run_latex(workdir, deadline)
+            if format_pathname:
+                # the whole document compiles but not with the format: the format is stale (e.g. latex was upgraded)
+                drop_format()
+        result = run(['dvipng', '-T', 'tight', '-z', '9', '--truecolor', '-o', 'texput.png', 'texput.dvi'], workdir, deadline)
+        if result.returncode:
+            raise RenderError(UNKNOWN_ERROR, result.stdout.decode('utf-8', 'replace'))
+        os.replace(pathlib.Path(workdir, 'texput.png'), pathname)
+
+
+class UnsupportedContent(Exception):
+    # the renderer can not render the content, the next renderer is tried; the message is the reason of the fallback
+    pass
+
+
+class LatexRenderer:
+    """
+    latex + dvipng, renders everything the preamble supports.
+    """
+    name = 'latex'
+    fallback_reasons = ()
+
+    def render(self, content, pathname):
+        render_to_file(content, pathname)
+
+
+class MathtextRenderer:
+    """
+    matplotlib mathtext in the server process, without subprocess, for single line ASCII contents: inline formulas ($...$)
+    whose commands mathtext knows, between plain words. Everything else is left to latex (text mode commands, environments...).
+    """
+    name = 'mathtext'
+    fallback_reasons = ('too_long', 'not_math', 'multiline', 'text', 'command', 'unavailable', 'parse_error', 'render_error')
+    max_length = 200
+    supported_commands = frozenset((
+        'alpha', 'beta', 'gamma', 'delta', 'epsilon', 'varepsilon', 'zeta', 'eta', 'theta', 'vartheta', 'iota', 'kappa',
+        'lambda', 'mu', 'nu', 'xi', 'pi', 'varpi', 'rho', 'varrho', 'sigma', 'varsigma', 'tau', 'upsilon', 'phi', 'varphi',
+        'chi', 'psi', 'omega', 'Gamma', 'Delta', 'Theta', 'Lambda', 'Xi', 'Pi', 'Sigma', 'Upsilon', 'Phi', 'Psi', 'Omega',
+        'frac', 'sqrt', 'sum', 'prod', 'int', 'oint', 'lim', 'infty', 'partial', 'nabla', 'left', 'right',
+        'cdot', 'cdots', 'ldots', 'times', 'div', 'pm', 'mp', 'leq', 'geq', 'neq', 'ne', 'approx', 'equiv', 'sim',
+        'in', 'notin', 'subset', 'subseteq', 'supset', 'supseteq', 'cup', 'cap', 'emptyset', 'forall', 'exists',
+        'to', 'rightarrow', 'leftarrow', 'Rightarrow', 'Leftarrow', 'leftrightarrow', 'Leftrightarrow',
+        'sin', 'cos', 'tan', 'cot', 'arcsin', 'arccos', 'arctan', 'log', 'ln', 'exp', 'min', 'max',
+        'overline', 'bar', 'hat', 'vec', 'dot', 'mathrm', 'mathbf', 'mathit', 'circ', 'angle', 'perp', 'parallel',
+        'quad', 'qquad',
+    ))
+    command_pattern = re.compile(r'\\([A-Za-z]+)')
+    # words between the formulas, which latex would print as they are in text mode
+    text_pattern = re.compile(r"^[A-Za-z0-9 .,;:!?()'+=/-]*$")
+
+    def check(self, content):
+        if len(content) > self.max_length:
+            raise UnsupportedContent('too_long')
+        parts = content.split('$')
+        if not content.isascii() or '\\$' in content or len(parts) < 3 or len(parts) % 2 == 0 or not all(parts[1::2]):
+            raise UnsupportedContent('not_math')
+        if '\n' in content or '\\\\' in content:
+            raise UnsupportedContent('multiline')
+        if not all(self.text_pattern.match(text) for text in parts[::2]):
+            raise UnsupportedContent('text')
+        for command in self.command_pattern.findall(content):
+            if command not in self.supported_commands:
+                raise UnsupportedContent('command')
+
+    def render(self, content, pathname):
+        self.check(content)
+        try:
+            from matplotlib import mathtext
+            from matplotlib.font_manager import FontProperties
+        except ImportError:
+            raise UnsupportedContent('unavailable')
+        try:
+            # Computer Modern 12pt at 100 dpi, as the document of latex rendered by dvipng
+            with open(pathname, 'wb') as f:
+                mathtext.math_to_image(content, f, prop=FontProperties(size=12, math_fontfamily='cm'), dpi=100, format='png')
+        except ValueError:
+            raise UnsupportedContent('parse_error')
+        except Exception:
+            # any other failure of matplotlib (fonts, backend...) leaves the content to latex
+            raise UnsupportedContent('render_error')
+
+
+renderers = {renderer.name: renderer for renderer in (MathtextRenderer(), LatexRenderer())}
+
+
+def get_renderers():
+    return [renderers[name] for name in getattr(settings, 'PRACTICE_LATEX_RENDERERS', ['mathtext', 'latex'])]
+
+
+STATS_PREFIX = 'practice.latex.stats'
+
+
+def get_stats_cache():
+    return caches[getattr(settings, 'PRACTICE_LATEX_STATS_CACHE_ALIAS', 'practice_stats')]
+
+
+def get_renders_key(renderer_name):
+    return f'{STATS_PREFIX}.renders:{renderer_name}'
+
+
+def get_microseconds_key(renderer_name):
+    return f'{STATS_PREFIX}.microseconds:{renderer_name}'
+
+
+def get_fallbacks_key(renderer_name, reason):
+    return f'{STATS_PREFIX}.fallbacks:{renderer_name}:{reason}'
+
+
+def get_stats_keys():
+    keys = []
+    for name, renderer in renderers.items():
+        keys.extend([get_renders_key(name), get_microseconds_key(name)])
+        keys.extend(get_fallbacks_key(name, reason) for reason in renderer.fallback_reasons)
+    return keys
+
+
+def render_content(content, pathname):
+    """
+    Renders content to the PNG pathname with the first renderer of PRACTICE_LATEX_RENDERERS which supports it, raises RenderError.
+    Records the number of renders and their duration by renderer, and the reasons of the fallbacks.
+    """
+    cache = get_stats_cache()
+    for renderer in get_renderers():
+        start = time.perf_counter()
+        try:
+            renderer.render(content, pathname)
+        except UnsupportedContent as e:
+            increase_stat(cache, get_fallbacks_key(renderer.name, str(e)), 1)
+            continue
+        increase_stat(cache, get_renders_key(renderer.name), 1)
+        increase_stat(cache, get_microseconds_key(renderer.name), int((time.perf_counter() - start) * 1_000_000))
+        return renderer.name
+    raise RenderError(UNKNOWN_ERROR, 'no renderer')
+
+
+def get_stats():
+    """
+    Returns ({renderer: (number of renders, total duration in seconds)}, {(renderer, reason): number of fallbacks}).
+    """
+    stats = get_stats_cache().get_many(get_stats_keys())
+    renders = {name: (stats.get(get_renders_key(name), 0), stats.get(get_microseconds_key(name), 0) / 1_000_000) for name in renderers}
+    fallbacks = {(name, reason): stats[get_fallbacks_key(name, reason)]
+                 for name, renderer in renderers.items() for reason in renderer.fallback_reasons
+                 if get_fallbacks_key(name, reason) in stats}
+    return renders, fallbacks
+
+
+def reset_stats():
+    get_stats_cache().delete_many(get_stats_keys())
+
+
+def get_state(job_id):
+    """
+    Returns (PENDING, DONE, FAILED or None if the job is unknown, filename of the PNG if DONE else error code if FAILED).
+    """
+    pathname = get_pathname(job_id)
+    if pathname.exists():
+        return DONE, get_filename(job_id)
+    now = time.time()
+    try:
+        error_pathname = get_pathname(job_id, '.err')
+        if now - error_pathname.stat().st_mtime < get_failure_ttl():
+            return FAILED, error_pathname.read_text(encoding='utf-8') or UNKNOWN_ERROR
+    except FileNotFoundError:
+        pass
+    with _executor_lock:
+        if job_id in _jobs:
+            return PENDING, ''
+    try:
+        pending_pathname = get_pathname(job_id, '.pending')
+        mtime = pending_pathname.stat().st_mtime
+        if now - mtime < get_pending_ttl(pending_pathname.read_text(encoding='utf-8')):
+            return PENDING, ''
+    except FileNotFoundError:
+        pass
+    return None, ''
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_queued_count = 0
+# {job id: future} of the jobs queued or running in this process
+_jobs = {}
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=get_workers(), thread_name_prefix='latex')
+        return _executor
+
+
+def run_job(content, job_id):
+    global _queued_count
+    pathname = get_pathname(job_id)
+    # the time of the queue is not counted in the time of the render
+    get_pathname(job_id, '.pending').write_text(RUNNING_MARKER, encoding='utf-8')
+    fd, tmp_pathname = tempfile.mkstemp(dir=pathname.parent, suffix='.tmp')
+    os.close(fd)
+    try:
+        render_content(content, tmp_pathname)
+        os.replace(tmp_pathname, pathname)
+    except RenderError as e:
+        get_pathname(job_id, '.err').write_text(e.code, encoding='utf-8')
+    except Exception:
+        get_pathname(job_id, '.err').write_text(UNKNOWN_ERROR, encoding='utf-8')
+    finally:
+        with _executor_lock:
+            _queued_count -= 1
+            _jobs.pop(job_id, None)
+        for leftover_pathname in (tmp_pathname, get_pathname(job_id, '.pending')):
+            try:
+                os.remove(leftover_pathname)
+            except FileNotFoundError:
+                pass
+    evict(get_max_size())
+
+
+def submit(content):
+    """
+    Starts the render of content if it is not done nor running, returns the id of its job.
+    Raises RenderError(BUSY_ERROR) if PRACTICE_LATEX_MAX_QUEUED jobs of this process are waiting.
+    """
+    global _queued_count
+    job_id = get_key(content)
+    status, _ = get_state(job_id)
+    if status == DONE:
+        # the recently used renders are evicted last
+        os.utime(get_pathname(job_id))
+        return job_id
+    if status in (PENDING, FAILED):
+        return job_id
+
+    pending_pathname = get_pathname(job_id, '.pending')
+    pending_pathname.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        os.remove(get_pathname(job_id, '.err'))
+    except FileNotFoundError:
+        pass
+    with _executor_lock:
+        if _queued_count >= get_max_queued():
+            raise RenderError(BUSY_ERROR)
+        _queued_count += 1
+    try:
+        # only one process starts the job, a stale marker (its process died) is taken over
+        with open(pending_pathname, 'x', encoding='utf-8') as f:
+            f.write(QUEUED_MARKER)
+    except FileExistsError:
+        if get_state(job_id)[0] == PENDING:
+            with _executor_lock:
+                _queued_count -= 1
+            return job_id
+        pending_pathname.write_text(QUEUED_MARKER, encoding='utf-8')
+    executor = get_executor()
+    with _executor_lock:
+        # run_job forgets the job under the same lock, once it is known
+        _jobs[job_id] = executor.submit(run_job, content, job_id)
+    return job_id
+
+
+def evict(max_size):
+    """
+    Removes the least recently used renders until the cache takes at most max_size bytes, and the expired failures,
+    returns the number of removed renders.
+    """
+    entries = []
+    total_size = 0
+    cache_root = get_cache_root()
+    if not cache_root.is_dir():
+        return 0
+    expired_at = time.time() - get_failure_ttl()
+    with os.scandir(cache_root) as directories:
+        for directory in directories:
+            if not directory.is_dir():
+                continue
+            with os.scandir(directory.path) as files:
+                for file in files:
+                    try:
+                        stat = file.stat()
+                        if file.name.endswith('.err') and stat.st_mtime < expired_at:
+                            os.remove(file.path)
+                    except FileNotFoundError:
+                        continue
+                    if not file.name.endswith('.png'):
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, file.path))
+                    total_size += stat.st_size
+
+    removed = 0
+    entries.sort()
+    for _, size, path in entries:
+        if total_size <= max_size:
+            break
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+        total_size -= size
+    return removed
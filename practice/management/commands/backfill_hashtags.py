@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from practice.models import Question, Hashtag
+
+
+class Command(BaseCommand):
+    help = 'Tách Question.hashtags (chuỗi ngăn cách bởi dấu phẩy) thành bảng Hashtag cho các câu hỏi hiện có.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        Through = Hashtag.questions.through
+        question_count = 0
+        link_count = 0
+
+        batch = []
+        rows = Question.objects.exclude(hashtags='').order_by('id').values_list('id', 'hashtags').iterator(chunk_size=batch_size)
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                link_count += self.backfill(batch, Through)
+                question_count += len(batch)
+                batch = []
+        if batch:
+            link_count += self.backfill(batch, Through)
+            question_count += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Đã tách hashtag của {question_count} câu hỏi ({link_count} liên kết).'))
+
+    @staticmethod
+    def backfill(batch, Through):
+        names_by_question_id = {question_id: {name.strip()[:255] for name in hashtags.split(',') if name.strip()} for question_id, hashtags in batch}
+        with transaction.atomic():
+            hashtags = Hashtag.get_or_create_all(set().union(*names_by_question_id.values()))
+            hashtag_ids = {hashtag.name: hashtag.id for hashtag in hashtags}
+            links = [Through(question_id=question_id, hashtag_id=hashtag_ids[name])
+                     for question_id, names in names_by_question_id.items() for name in names]
+            Through.objects.bulk_create(links, ignore_conflicts=True)
+        return len(links)
@@ -0,0 +1,51 @@
+import pathlib
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from practice import latex
+
+
+class Command(BaseCommand):
+    help = 'Đo thời gian tạo ảnh latex khi dùng preamble đã biên dịch sẵn (format) và khi biên dịch toàn bộ tài liệu.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=20)
+        parser.add_argument('--formula', default='\\text{Tính } \\int_0^1 x^2\\,dx \\text{ và } \\sum_{k=1}^{n} k^2')
+
+    def measure(self, formula, count, using_format, workdir):
+        durations = []
+        for i in range(count):
+            # the render cache is not used, every render runs latex and dvipng
+            start = time.perf_counter()
+            latex.render_to_file(formula, pathlib.Path(workdir, f'{int(using_format)}_{i}.png'), using_format=using_format)
+            durations.append((time.perf_counter() - start) * 1000)
+        return durations
+
+    def handle(self, *args, **options):
+        count = options['count']
+        formula = options['formula']
+
+        start = time.perf_counter()
+        if latex.build_format() is None:
+            raise CommandError('Không thể tạo format của preamble (latex chưa được cài đặt?).')
+        self.stdout.write(f'Tạo format của preamble: {(time.perf_counter() - start) * 1000:.1f} ms')
+
+        results = {}
+        with tempfile.TemporaryDirectory() as workdir:
+            try:
+                for using_format in (True, False):
+                    results[using_format] = self.measure(formula, count, using_format, workdir)
+            except latex.RenderError as e:
+                raise CommandError(f'Không thể tạo ảnh latex ({e.code}).')
+
+        for using_format, label in ((True, 'format'), (False, 'toàn bộ tài liệu')):
+            durations = sorted(results[using_format])
+            self.stdout.write(f'{label}: trung bình {statistics.mean(durations):.1f} ms, '
+                              f'trung vị {statistics.median(durations):.1f} ms, '
+                              f'p95 {durations[min(len(durations) - 1, int(len(durations) * 0.95))]:.1f} ms, '
+                              f'nhỏ nhất {durations[0]:.1f} ms')
+        speedup = statistics.median(results[False]) / statistics.median(results[True])
+        self.stdout.write(self.style.SUCCESS(f'Đã đo {count} lượt mỗi cách, format nhanh hơn {speedup:.2f} lần (theo trung vị).'))
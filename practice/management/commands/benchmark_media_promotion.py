@@ -0,0 +1,60 @@
+import os
+import pathlib
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+
+from practice.media import QuestionMediaStorage, save_preview_file, get_preview_digest
+
+
+class Command(BaseCommand):
+    help = ('Đo thời gian chuyển tệp video xem trước (TMP_MEDIA_ROOT) thành tệp media của câu hỏi khi gửi câu hỏi: '
+            'ghi lại toàn bộ tệp (File + storage.save) và liên kết tệp (storage.link_file với mã băm đã tính khi xem trước).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10)
+        parser.add_argument('--size', type=float, default=12, help='kích thước mỗi tệp (MB)')
+
+    def measure(self, storage, pathnames, linking):
+        durations = []
+        for pathname in pathnames:
+            start = time.perf_counter()
+            if linking:
+                storage.link_file(str(pathname), 'video.mp4', digest=get_preview_digest(pathname))
+            else:
+                with open(pathname, 'rb') as f:
+                    storage.save('video.mp4', File(f))
+            durations.append((time.perf_counter() - start) * 1000)
+        return durations
+
+    def handle(self, *args, **options):
+        count = options['count']
+        size = int(options['size'] * 1024 * 1024)
+
+        results = {}
+        # the files are created next to TMP_MEDIA_ROOT and MEDIA_ROOT, in the same filesystems as the real ones
+        with tempfile.TemporaryDirectory(dir=settings.TMP_MEDIA_ROOT) as tmp_root, tempfile.TemporaryDirectory(dir=settings.MEDIA_ROOT) as media_root:
+            for linking in (False, True):
+                # distinct contents, a content addressed storage would not store a same content again
+                pathnames = []
+                for i in range(count):
+                    pathname = pathlib.Path(tmp_root, f'{int(linking)}_{i}.mp4')
+                    # as the preview of new_question writes it
+                    save_preview_file(pathname, ContentFile(os.urandom(size)))
+                    pathnames.append(pathname)
+                storage = QuestionMediaStorage(location=pathlib.Path(media_root, str(int(linking))))
+                results[linking] = self.measure(storage, pathnames, linking)
+
+        for linking, label in ((False, 'ghi lại tệp'), (True, 'liên kết tệp')):
+            durations = sorted(results[linking])
+            self.stdout.write(f'{label}: trung bình {statistics.mean(durations):.1f} ms, '
+                              f'trung vị {statistics.median(durations):.1f} ms, '
+                              f'p95 {durations[min(len(durations) - 1, int(len(durations) * 0.95))]:.1f} ms, '
+                              f'nhỏ nhất {durations[0]:.1f} ms')
+        speedup = statistics.median(results[False]) / statistics.median(results[True])
+        self.stdout.write(self.style.SUCCESS(f'Đã đo {count} tệp {options["size"]}MB mỗi cách, liên kết nhanh hơn {speedup:.2f} lần (theo trung vị).'))
@@ -0,0 +1,67 @@
+import os
+import shutil
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from practice import media
+from practice.models import QuestionMedia, MediaBlob, QuestionSnapshot
+
+
+class Command(BaseCommand):
+    help = 'Chuyển các tệp media của câu hỏi sang tên theo SHA-256 của nội dung, mỗi nội dung chỉ lưu 1 lần, và tính lại MediaBlob.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        storage = QuestionMedia.file.field.storage
+
+        names = (QuestionMedia.objects.exclude(file='').exclude(file__startswith=f'{media.BLOBS_DIRNAME}/')
+                 .order_by('file').values_list('file', flat=True).distinct())
+        moved_count = removed_count = reclaimed_size = missing_count = 0
+        blob_names = set()
+        for name in names.iterator():
+            path = storage.path(name)
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                missing_count += 1
+                continue
+            blob_name = media.get_blob_name(media.hash_file(path), media.get_extension(name))
+            blob_path = storage.path(blob_name)
+            if blob_name in blob_names or os.path.exists(blob_path):
+                removed_count += 1
+                reclaimed_size += size
+            else:
+                moved_count += 1
+            blob_names.add(blob_name)
+            if dry_run:
+                continue
+
+            # the blob exists before the rows point to it and the old file is removed after, an interruption loses nothing
+            if not os.path.exists(blob_path):
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                try:
+                    os.link(path, blob_path)
+                except OSError:
+                    shutil.copy2(path, blob_path)
+            QuestionMedia.objects.filter(file=name).update(file=blob_name)
+            os.remove(path)
+
+        if not dry_run:
+            with transaction.atomic():
+                MediaBlob.objects.all().delete()
+                MediaBlob.objects.bulk_create([
+                    MediaBlob(name=row['file'], size=storage.size(row['file']) if storage.exists(row['file']) else 0, ref_count=row['ref_count'])
+                    for row in QuestionMedia.objects.exclude(file='').values('file').annotate(ref_count=Count('id')).order_by('file')
+                ])
+                # the snapshots keep the old names, QuestionSnapshot.get_many rebuilds them
+                QuestionSnapshot.objects.all().delete()
+
+        prefix = 'Sẽ' if dry_run else 'Đã'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix} chuyển {moved_count} tệp, xóa {removed_count} tệp trùng nội dung, '
+            f'giải phóng {reclaimed_size} byte ({reclaimed_size / 1024 / 1024:.2f}MB). Không tìm thấy {missing_count} tệp.'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from practice import latex, stats
+
+
+class Command(BaseCommand):
+    help = 'Hiển thị số lần tạo ảnh latex, thời gian trung bình của từng renderer và lý do chuyển sang renderer tiếp theo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Đặt lại các số liệu sau khi hiển thị.')
+
+    def handle(self, *args, **options):
+        if not stats.is_shared_cache(latex.get_stats_cache()):
+            raise CommandError('PRACTICE_LATEX_STATS_CACHE_ALIAS phải là cache dùng chung giữa các tiến trình (file, database...), '
+                               'số liệu trong cache bộ nhớ của server không đọc được từ lệnh này.')
+        renders, fallbacks = latex.get_stats()
+        total = sum(count for count, _ in renders.values())
+        for name, (count, seconds) in renders.items():
+            ratio = count / total if total else 0
+            average = seconds * 1000 / count if count else 0
+            self.stdout.write(f'{name}: {count} lần ({ratio:.2%}), trung bình {average:.1f} ms')
+        for (name, reason), count in fallbacks.items():
+            self.stdout.write(f'{name} -> renderer tiếp theo ({reason}): {count} lần')
+        self.stdout.write(self.style.SUCCESS(f'Tổng số ảnh đã tạo: {total}'))
+        if options['reset']:
+            latex.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Đã đặt lại các số liệu.'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from practice import question_cards, stats
+
+
+class Command(BaseCommand):
+    help = 'Hiển thị tỉ lệ trúng cache của các thẻ câu hỏi đã render.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Đặt lại số lần trúng/trượt sau khi hiển thị.')
+
+    def handle(self, *args, **options):
+        if not stats.is_shared_cache(question_cards.get_stats_cache()):
+            raise CommandError('PRACTICE_QUESTION_CARD_STATS_CACHE_ALIAS phải là cache dùng chung giữa các tiến trình (file, database...), '
+                               'số liệu trong cache bộ nhớ của server không đọc được từ lệnh này.')
+        hits, misses = question_cards.get_stats()
+        total = hits + misses
+        ratio = hits / total if total else 0
+        self.stdout.write(self.style.SUCCESS(f'Trúng: {hits}, trượt: {misses}, tỉ lệ trúng: {ratio:.2%}'))
+        if options['reset']:
+            question_cards.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Đã đặt lại số lần trúng/trượt.'))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from practice.models import Question, Answer, Comment, QuestionSnapshot
+
+
+class Command(BaseCommand):
+    help = 'Tính lại answer_count và comment_count của tất cả câu hỏi.'
+
+    def handle(self, *args, **options):
+        answer_counts = (Answer.objects.filter(question_id=OuterRef('id'))
+                         .order_by().values('question_id').annotate(c=Count('id')).values('c'))
+        comment_counts = (Comment.objects.filter(~Q(state='Locked'), question_id=OuterRef('id'))
+                          .order_by().values('question_id').annotate(c=Count('id')).values('c'))
+        with transaction.atomic():
+            updated = Question.objects.update(
+                answer_count=Coalesce(Subquery(answer_counts, output_field=IntegerField()), Value(0)),
+                comment_count=Coalesce(Subquery(comment_counts, output_field=IntegerField()), Value(0)),
+                version=F('version') + 1,
+            )
+            # the snapshots show the old counters, QuestionSnapshot.get_many rebuilds them
+            QuestionSnapshot.objects.all().delete()
+        self.stdout.write(self.style.SUCCESS(f'Đã tính lại bộ đếm của {updated} câu hỏi.'))
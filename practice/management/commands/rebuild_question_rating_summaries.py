@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from practice.models import QuestionEvaluation, QuestionRatingSummary, QuestionSnapshot
+
+
+class Command(BaseCommand):
+    help = 'Tính lại QuestionRatingSummary (số sao gần nhất của từng người dùng) của tất cả câu hỏi.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        # one pass over the ratings ordered by (question, user, time): the last row of a (question, user) is its latest rating
+        rows = (QuestionEvaluation.objects.filter(question_rating__isnull=False)
+                .order_by('question_id', 'user_id', 'created_at', 'id')
+                .values_list('question_id', 'user_id', 'question_rating')
+                .iterator(chunk_size=batch_size))
+
+        with transaction.atomic():
+            QuestionRatingSummary.objects.all().delete()
+            count = 0
+            batch = []
+            summary = None
+            for question_id, user_id, rating in rows:
+                if summary is None or summary.question_id != question_id:
+                    summary = QuestionRatingSummary(question_id=question_id, latest_ratings={})
+                    batch.append(summary)
+                    if len(batch) > batch_size:
+                        QuestionRatingSummary.objects.bulk_create(batch[:-1])
+                        count += len(batch) - 1
+                        batch = batch[-1:]
+                summary.set_latest_rating(user_id, rating)
+            QuestionRatingSummary.objects.bulk_create(batch)
+            count += len(batch)
+            # the snapshots show the old ratings, QuestionSnapshot.get_many rebuilds them
+            QuestionSnapshot.objects.all().delete()
+
+        self.stdout.write(self.style.SUCCESS(f'Đã tính lại đánh giá của {count} câu hỏi.'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from practice import search
+from practice.models import Question
+
+
+class Command(BaseCommand):
+    help = 'Tạo lại chỉ mục tìm kiếm toàn văn (SQLite FTS5) cho nội dung câu hỏi.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if not search.is_search_index_available():
+            self.stdout.write(self.style.WARNING('Cơ sở dữ liệu không phải SQLite, bộ lọc nội dung dùng icontains.'))
+            return
+        with transaction.atomic():
+            count = search.rebuild_question_search_index(
+                Question.objects.order_by().values_list('id', 'content').iterator(chunk_size=options['batch_size']),
+                batch_size=options['batch_size'],
+            )
+        self.stdout.write(self.style.SUCCESS(f'Đã đánh chỉ mục {count} câu hỏi.'))
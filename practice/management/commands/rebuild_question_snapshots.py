@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from practice.models import Question, QuestionSnapshot
+
+
+class Command(BaseCommand):
+    help = 'Tạo lại QuestionSnapshot của tất cả câu hỏi.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        question_ids = list(Question.objects.order_by('id').values_list('id', flat=True))
+        count = 0
+        for i in range(0, len(question_ids), batch_size):
+            count += len(QuestionSnapshot.rebuild(question_ids[i:i + batch_size]))
+
+        self.stdout.write(self.style.SUCCESS(f'Đã tạo lại snapshot của {count} câu hỏi.'))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Min, OuterRef, Q, Subquery
+
+from practice.models import Answer, UserQuestionProgress
+
+
+class Command(BaseCommand):
+    help = 'Tính lại UserQuestionProgress (các câu hỏi mỗi người dùng đã làm) từ bảng Answer.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_is_correct = (Answer.objects.filter(user_id=OuterRef('user_id'), question_id=OuterRef('question_id'))
+                           .order_by('-created_at', '-id').values('is_correct')[:1])
+        rows = (Answer.objects.order_by().values('user_id', 'question_id')
+                .annotate(first_answered_at=Min('created_at'),
+                          last_answered_at=Max('created_at'),
+                          attempts=Count('id'),
+                          correct_count=Count('id', filter=Q(is_correct=True)),
+                          last_is_correct=Subquery(last_is_correct)))
+
+        count = 0
+        with transaction.atomic():
+            UserQuestionProgress.objects.all().delete()
+            batch = []
+            for row in rows.iterator(chunk_size=batch_size):
+                batch.append(UserQuestionProgress(**row))
+                if len(batch) >= batch_size:
+                    UserQuestionProgress.objects.bulk_create(batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                UserQuestionProgress.objects.bulk_create(batch)
+                count += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Đã tạo {count} bản ghi UserQuestionProgress.'))
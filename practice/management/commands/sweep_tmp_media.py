@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from practice import tmp_media
+
+
+class Command(BaseCommand):
+    help = 'Xóa các tệp xem trước cũ trong TMP_MEDIA_ROOT và các tệp vượt quá giới hạn dung lượng của mỗi người dùng và của thư mục.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        result = tmp_media.sweep(dry_run=dry_run)
+
+        prefix = 'Sẽ xóa' if dry_run else 'Đã xóa'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix} {result.removed_count} tệp ({result.removed_size / 1024 / 1024:.2f}MB), '
+            f'còn lại {result.kept_count} tệp ({result.kept_size / 1024 / 1024:.2f}MB). '
+            f'Đã xóa {result.evicted_latex_count} ảnh latex khỏi bộ nhớ đệm.'))
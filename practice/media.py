@@ -0,0 +1,295 @@
+import errno
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import tempfile
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.deconstruct import deconstructible
+from django.utils.http import http_date, parse_http_date_safe
+
+# Delivery of QuestionMedia files by practice.views.view_question_media:
+# conditional requests (ETag/Last-Modified), single byte ranges (206, If-Range) and, depending on PRACTICE_MEDIA_OFFLOAD,
+#   ''          : the file is returned as a FileResponse, the WSGI server sends it with its wsgi.file_wrapper
+#                 (os.sendfile for gunicorn, uWSGI...), from the start of the range and for the length of the range
+#   'x-accel'   : nginx sends PRACTICE_MEDIA_OFFLOAD_PREFIX + name (an internal location aliased to MEDIA_ROOT)
+#   'x-sendfile': apache (mod_xsendfile) or lighttpd sends the absolute path of the file
+# Offloaded responses only carry the header, the server handles the ranges itself.
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+# With PRACTICE_MEDIA_CONTENT_ADDRESSED, a new QuestionMedia file is named by the SHA-256 of its content, hashed while it is
+# written: blobs/<aa>/<bb>/<sha256><extension>. A content is stored once whatever the number of QuestionMedia which use it,
+# MediaBlob counts them and the file is removed with its last QuestionMedia.
+# Files saved before (timestamped names) keep their names, the dedupe_question_media command moves them to blobs.
+BLOBS_DIRNAME = 'blobs'
+CHUNK_SIZE = 64 * 1024
+# the digest of a preview file of TMP_MEDIA_ROOT is computed while it is written and kept next to it (<file>.sha256),
+# so that submitting the question links the file into the storage without reading it again
+DIGEST_SUFFIX = '.sha256'
+
+
+def is_content_addressed():
+    return getattr(settings, 'PRACTICE_MEDIA_CONTENT_ADDRESSED', True)
+
+
+def get_blob_name(digest, extension):
+    return posixpath.join(BLOBS_DIRNAME, digest[:2], digest[2:4], f'{digest}{extension.lower()}')
+
+
+def get_extension(name):
+    return os.path.splitext(name)[1][:10]
+
+
+def hash_file(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def save_preview_file(pathname, content):
+    """
+    Writes the uploaded file content to pathname (TMP_MEDIA_ROOT) and its digest to pathname + DIGEST_SUFFIX.
+    """
+    sha256 = hashlib.sha256()
+    with open(pathname, 'wb+') as f:
+        for chunk in content.chunks():
+            sha256.update(chunk)
+            f.write(chunk)
+    with open(f'{pathname}{DIGEST_SUFFIX}', 'w', encoding='ascii') as f:
+        f.write(sha256.hexdigest())
+
+
+def get_preview_digest(pathname):
+    try:
+        with open(f'{pathname}{DIGEST_SUFFIX}', encoding='ascii') as f:
+            digest = f.read(65)
+    except OSError:
+        return None
+    return digest if re.fullmatch(r'[0-9a-f]{64}', digest) else None
+
+
+def remove_preview_file(pathname):
+    for path in (str(pathname), f'{pathname}{DIGEST_SUFFIX}'):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+@deconstructible
+class QuestionMediaStorage(FileSystemStorage):
+    # the url of a QuestionMedia file goes through view_question_media (visibility of the question, ranges)
+    def url(self, name):
+        return reverse('practice:view_question_media', args=[name.replace('\\', '/')])
+
+    def get_available_name(self, name, max_length=None):
+        # the name is the digest of the content (_save), an existing file of the same name has the same content
+        if is_content_addressed():
+            return name
+        return super().get_available_name(name, max_length=max_length)
+
+    def _save(self, name, content):
+        if not is_content_addressed():
+            return super()._save(name, content)
+
+        blobs_root = os.path.join(self.location, BLOBS_DIRNAME)
+        os.makedirs(blobs_root, exist_ok=True)
+        sha256 = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=blobs_root, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if hasattr(content, 'seek') and content.seekable():
+                    content.seek(0)
+                for chunk in content.chunks(CHUNK_SIZE):
+                    sha256.update(chunk)
+                    f.write(chunk)
+            blob_name = get_blob_name(sha256.hexdigest(), get_extension(name))
+            path = self.path(blob_name)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(tmp_path, self.file_permissions_mode)
+                # a concurrent save of the same content replaces it with the same bytes
+                os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return blob_name
+
+    def link_file(self, path, name, digest=None):
+        """
+        Adds the file at path (a file of TMP_MEDIA_ROOT) to the storage without copying it: a hard link in the same
+        filesystem, a streamed copy into the storage directory otherwise. path itself is left as it is.
+        name: the name given by upload_to, only its extension is kept when the storage is content addressed.
+        digest: SHA-256 of the file if it is known (get_preview_digest), the file is not read then.
+        Returns the name of the file in the storage.
+        """
+        if is_content_addressed():
+            name = get_blob_name(digest or hash_file(path), get_extension(name))
+            if self.exists(name):
+                return name
+        else:
+            name = self.get_available_name(name)
+        target = self.path(name)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.link(path, target)
+            return name
+        except FileExistsError:
+            if is_content_addressed():
+                # linked meanwhile by a concurrent request, same content
+                return name
+            return self.link_file(path, name)
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.ENOTSUP, errno.EMLINK):
+                raise
+
+        # another filesystem (or no hard links): a copy next to the target, which is then in the same filesystem
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f, open(path, 'rb') as source:
+                shutil.copyfileobj(source, f, CHUNK_SIZE)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            return self.link_file(tmp_path, name, digest=digest)
+        finally:
+            os.remove(tmp_path)
+
+
+def get_etag(stat):
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def get_content_type(path, media_type):
+    content_type, _ = mimetypes.guess_type(path)
+    if content_type:
+        return content_type
+    return {'video': 'video/mp4', 'audio': 'audio/mpeg'}.get(media_type, 'application/octet-stream')
+
+
+def parse_range(range_header, size):
+    """
+    Returns (start, end) (end included) of a single 'bytes=' range,
+    None if there is no range to apply (no header, several ranges, another unit) and
+    False if the range can not be satisfied.
+    """
+    match = RANGE_PATTERN.match(range_header.strip()) if range_header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # 'bytes=-500': the last 500 bytes
+        length = int(last)
+        if not length or not size:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def is_if_range_satisfied(request, etag, last_modified):
+    # the range only applies to the version of the file the client has a part of
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    if_range_date = parse_http_date_safe(if_range)
+    return if_range_date is not None and if_range_date >= last_modified
+
+
+class FileRange:
+    """
+    The bytes [start, start + length) of an open file. fileno() is kept so that the wsgi.file_wrapper of the server
+    can send it with os.sendfile from the current offset of the file, for Content-Length bytes.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size) if size else b''
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def serve_file(request, path, name, content_type):
+    """
+    path: absolute path of the file, name: its name in the storage (for PRACTICE_MEDIA_OFFLOAD = 'x-accel').
+    The caller has checked that the user may read the file.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    etag = get_etag(stat)
+    last_modified = int(stat.st_mtime)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        # visibility of the question may change, the browser revalidates (304) before using its copy
+        'Cache-Control': 'private, no-cache',
+        'Accept-Ranges': 'bytes',
+    }
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        if isinstance(response, HttpResponseNotModified):
+            for header, value in headers.items():
+                response[header] = value
+        return response
+
+    offload = getattr(settings, 'PRACTICE_MEDIA_OFFLOAD', '')
+    if offload == 'x-accel':
+        response = HttpResponse(content_type=content_type, headers=headers)
+        # timestamped names may hold non-ASCII characters, which Django would MIME-encode in the header
+        response['X-Accel-Redirect'] = getattr(settings, 'PRACTICE_MEDIA_OFFLOAD_PREFIX', '/protected-media/') + quote(name)
+        return response
+    if offload == 'x-sendfile':
+        response = HttpResponse(content_type=content_type, headers=headers)
+        response['X-Sendfile'] = path
+        return response
+
+    size = stat.st_size
+    byte_range = parse_range(request.META.get('HTTP_RANGE'), size) if is_if_range_satisfied(request, etag, last_modified) else None
+    if byte_range is False:
+        response = HttpResponse(status=416, content_type='text/plain', headers=headers)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+    response = FileResponse(FileRange(open(path, 'rb'), start, length), content_type=content_type, headers=headers)
+    response['Content-Length'] = str(length)
+    if byte_range:
+        response.status_code = 206
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
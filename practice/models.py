@@ -4,10 +4,14 @@ import random
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction, IntegrityError
 from django.db.models import Max, F, Q, Subquery, Count
 from django.utils.translation import gettext_lazy as _
 
+from users.models import normalize_text, get_exact_or_prefix_filter
+
+from .media import QuestionMediaStorage, is_content_addressed, get_preview_digest, remove_preview_file
+
 
 # def explain(self):
 #     cursor = connections[self.db].cursor()
@@ -43,9 +47,36 @@ class Question(models.Model):
     hashtags = models.TextField(verbose_name=_('các hashtag'), default='', )
     # datetime.datetime.now(datetime.timezone.utc)
     created_at = models.DateTimeField(_('thời điểm tạo'), )
+    # denormalized counters, maintained by Answer.save, Comment.save and practice.signals
+    answer_count = models.IntegerField(verbose_name=_('số lượt làm'), default=0, )
+    # only counts comments which are not Locked
+    comment_count = models.IntegerField(verbose_name=_('số bình luận'), default=0, )
+    # bumped whenever what a question card shows changes (state, counters), keys the cached cards (practice.question_cards)
+    # and tells whether a QuestionSnapshot is up to date: a write which does not go through Question.save
+    # (QuerySet.update, bulk actions) must set version=F('version') + 1
+    version = models.IntegerField(verbose_name=_('phiên bản'), default=0, )
 
     objects = models.Manager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-answer_count', '-created_at'], name='practice_q_answer_count_idx'),
+            models.Index(fields=['-comment_count', '-created_at'], name='practice_q_comment_count_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        # incremented in the database, a concurrent counter update must not get the same version
+        self.version = F('version') + 1
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=['version'])
+        # a new question gets its snapshot once its hashtags and media are saved (process_new_question)
+        QuestionSnapshot.rebuild([self.id])
+
     def is_single_choice(self):
         count = 0
         for choice in self.choices:
@@ -56,56 +87,99 @@ class Question(models.Model):
         return True
 
     def get_display_hashtags(self):
+        # lists prefetch 'hashtag_set' so that they do not re-parse the string (the prefetch is cached as 'hashtag')
+        if 'hashtag' in getattr(self, '_prefetched_objects_cache', {}):
+            names = [hashtag.name for hashtag in self.hashtag_set.all()]
+            return f'#{" #".join(names)}' if names else ''
         return f'#{(self.hashtags or "").replace(",", " #")}' if self.hashtags else ''
 
+    def set_hashtags(self, names):
+        self.hashtag_set.set(Hashtag.get_or_create_all(names))
+
     def get_number_of_answers(self):
-        return self.answer_set.count()
+        return self.answer_count
 
     def get_number_of_comments(self):
-        return self.comment_set.count()
+        return self.comment_count
+
+    def rebuild_counters(self):
+        self.answer_count = self.answer_set.count()
+        self.comment_count = self.comment_set.filter(~Q(state='Locked')).count()
+        Question.objects.filter(id=self.id).update(answer_count=self.answer_count, comment_count=self.comment_count, version=F('version') + 1)
+
+    @staticmethod
+    def load_media(questions):
+        # one query for the media of all the questions, get_media_files then reads them from the instances
+        models.prefetch_related_objects([question for question in questions if question.id], 'questionmedia_set')
+
+    def get_media_files(self):
+        """
+        Returns {QuestionMedia.name: file} of the question.
+        """
+        if not self.id:
+            return {}
+        if 'questionmedia_set' not in getattr(self, '_prefetched_objects_cache', {}):
+            Question.load_media([self])
+        return {qm.name: qm.file for qm in self.questionmedia_set.all()
+                if QuestionMedia.MEDIA_TYPES_BY_NAME.get(qm.name) == qm.media_type}
 
     def get_latex_image(self):
-        if self.id:
-            qm = QuestionMedia.objects.filter(question_id=self.id, name='question_latex_image', media_type='image')
-            if qm:
-                return qm[0].file
-        return None
+        return self.get_media_files().get('question_latex_image')
 
     def get_addition_image(self):
-        if self.id:
-            qm = QuestionMedia.objects.filter(question_id=self.id, name='question_addition_image', media_type='image')
-            if qm:
-                return qm[0].file
-        return None
+        return self.get_media_files().get('question_addition_image')
 
     def get_video(self):
-        if self.id:
-            qm = QuestionMedia.objects.filter(question_id=self.id, name='question_video', media_type='video')
-            if qm:
-                return qm[0].file
-        return None
+        return self.get_media_files().get('question_video')
 
     def get_audio(self):
-        if self.id:
-            qm = QuestionMedia.objects.filter(question_id=self.id, name='question_audio', media_type='audio')
-            if qm:
-                return qm[0].file
-        return None
+        return self.get_media_files().get('question_audio')
+
+    def get_display_media(self):
+        # attached media shown on the question cards, the latex image only renders the content
+        media_files = self.get_media_files()
+        return ', '.join(str(label) for name, label in QuestionMedia.ATTACHMENT_LABELS if name in media_files)
 
     def get_rating(self):
-        user_ids = QuestionEvaluation.objects.filter(question_id=self.id, question_rating__isnull=False).values_list('user_id', flat=True).distinct()
-        # are querying individually because "This version of MySQL doesn't yet support 'LIMIT & IN/ALL/ANY/SOME subquery'"
-        qes = [QuestionEvaluation.objects.filter(question_id=self.id, question_rating__isnull=False, user_id=user_id).order_by('-created_at')[0:1] for user_id in user_ids]
-        if qes:
-            sum_start = 0
-            len_qes = 0
-            for qe in qes:
-                # qe is queryset because "are querying individually"
-                if qe:
-                    len_qes += 1
-                    sum_start += qe[0].question_rating
-            return sum_start / len_qes, len_qes
-        return 0, 0
+        """
+        Returns (average of the latest rating of each user, number of users who have rated) from QuestionRatingSummary.
+        """
+        try:
+            summary = self.questionratingsummary
+        except QuestionRatingSummary.DoesNotExist:
+            return 0, 0
+        if not summary.rating_count:
+            return 0, 0
+        return summary.rating_sum / summary.rating_count, summary.rating_count
+
+
+class Hashtag(models.Model):
+    name = models.CharField(_('tên hashtag'), max_length=255, unique=True, )
+    # normalize_text(name), exact and prefix lookups use its index
+    normalized_name = models.CharField(_('tên hashtag đã chuẩn hoá'), max_length=255, db_index=True, )
+    questions = models.ManyToManyField(verbose_name=_('các câu hỏi'), to=Question, )
+
+    objects = models.Manager()
+
+    @staticmethod
+    def get_or_create_all(names):
+        names = {name.strip()[:255] for name in names if name.strip()}
+        if not names:
+            return []
+        Hashtag.objects.bulk_create([Hashtag(name=name, normalized_name=normalize_text(name)) for name in names], ignore_conflicts=True)
+        return list(Hashtag.objects.filter(name__in=names))
+
+    @staticmethod
+    def get_questions_filter(keywords):
+        """
+        Returns a Q matching questions which have one of the hashtags,
+        'abc' matches the hashtag abc exactly, 'abc*' matches hashtags starting with abc (case and accent insensitive).
+        """
+        condition = get_exact_or_prefix_filter('normalized_name', [keyword.strip().lstrip('#') for keyword in keywords])
+        if condition is None:
+            return None
+        question_ids = Hashtag.questions.through.objects.filter(hashtag__in=Hashtag.objects.filter(condition)).values('question_id')
+        return Q(id__in=question_ids)
 
 
 class QuestionMedia(models.Model):
@@ -119,6 +193,9 @@ class QuestionMedia(models.Model):
     media_type = models.CharField(verbose_name=_('tên loại media'), max_length=255, choices=STATE_CHOICES, default='image', )
 
     def upload_to(self, filename):
+        # the storage names the file by the digest of its content, only the extension of filename is kept
+        if is_content_addressed():
+            return filename
         media_type = self.media_type
         now = self.created_at
         salt = f"{random.randrange(1, 999999)}_"
@@ -129,15 +206,81 @@ class QuestionMedia(models.Model):
             media_pathname = pathlib.Path(settings.MEDIA_ROOT, prefix + salt + filename)
         return prefix + salt + filename
 
+    MEDIA_TYPES_BY_NAME = {
+        'question_latex_image': 'image',
+        'question_addition_image': 'image',
+        'question_video': 'video',
+        'question_audio': 'audio',
+    }
+    ATTACHMENT_LABELS = (
+        ('question_addition_image', _('Hình ảnh')),
+        ('question_video', _('Video')),
+        ('question_audio', _('Audio')),
+    )
+
     MAX_IMAGE_SIZE = 2.4
     MAX_VIDEO_SIZE = 12
     MAX_AUDIO_SIZE = 1.2
-    file = models.FileField(verbose_name=_('tên tệp media'), upload_to=upload_to, unique=True)
+    # several QuestionMedia share the file of a same content (practice.media), MediaBlob counts them
+    file = models.FileField(verbose_name=_('tên tệp media'), upload_to=upload_to, db_index=True, storage=QuestionMediaStorage())
     # datetime.datetime.now(datetime.timezone.utc)
     created_at = models.DateTimeField(_('thời điểm tạo'), )
 
     objects = models.Manager()
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding and self.file:
+                MediaBlob.add_reference(self.file.name, self.file.size)
+
+    def promote_file(self, pathname, filename, removing_source=True):
+        """
+        Sets the file of the QuestionMedia to the file at pathname (a preview file of TMP_MEDIA_ROOT) without rewriting it.
+        The preview file is removed once the QuestionMedia is committed, unless removing_source is False
+        (a rendered LaTeX image stays in the cache of practice.latex).
+        """
+        self.file = self.file.storage.link_file(str(pathname), self.file.field.generate_filename(self, filename), digest=get_preview_digest(pathname))
+        if removing_source:
+            transaction.on_commit(lambda: remove_preview_file(pathname))
+
+
+class MediaBlob(models.Model):
+    # maintained by QuestionMedia.save and practice.signals, rebuilt by the dedupe_question_media command
+    name = models.CharField(verbose_name=_('tên tệp media'), max_length=255, unique=True, )
+    size = models.BigIntegerField(verbose_name=_('kích thước'), default=0, )
+    ref_count = models.IntegerField(verbose_name=_('số media sử dụng'), default=0, )
+    created_at = models.DateTimeField(_('thời điểm tạo'), auto_now_add=True, )
+
+    objects = models.Manager()
+
+    @staticmethod
+    def add_reference(name, size):
+        with transaction.atomic():
+            blob, _ = MediaBlob.objects.select_for_update().get_or_create(name=name, defaults={'size': size})
+            MediaBlob.objects.filter(id=blob.id).update(ref_count=F('ref_count') + 1)
+
+    @staticmethod
+    def remove_reference(name):
+        # the file is removed with the last reference, once the deletion is committed
+        with transaction.atomic():
+            blob = MediaBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                return
+            if blob.ref_count > 1:
+                MediaBlob.objects.filter(id=blob.id).update(ref_count=F('ref_count') - 1)
+                return
+            blob.delete()
+            transaction.on_commit(lambda: MediaBlob.delete_file(name))
+
+    @staticmethod
+    def delete_file(name):
+        # the same content may have been uploaded again meanwhile
+        if MediaBlob.objects.filter(name=name).exists() or QuestionMedia.objects.filter(file=name).exists():
+            return
+        QuestionMedia.file.field.storage.delete(name)
+
 
 class Answer(models.Model):
     # [int, int, ...] lưu số thứ tự của các lựa chọn được chọn
@@ -150,6 +293,68 @@ class Answer(models.Model):
 
     objects = models.Manager()
 
+    class Meta:
+        indexes = [
+            # answers of a user to a question, newest first: the answer history of view_question
+            models.Index(fields=['user', 'question', 'created_at', 'id'], name='practice_answer_history_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                Question.objects.filter(id=self.question_id).update(answer_count=F('answer_count') + 1, version=F('version') + 1)
+                UserQuestionProgress.add_answer(self)
+                QuestionSnapshot.rebuild([self.question_id])
+
+
+class UserQuestionProgress(models.Model):
+    # one row per (user, question) the user has answered, so that answered/unanswered questions are a semi-join on its index
+    user = models.ForeignKey(verbose_name=_('người dùng'), to=get_user_model(), on_delete=models.CASCADE, )
+    question = models.ForeignKey(verbose_name=_('câu hỏi'), to=Question, on_delete=models.CASCADE, )
+    first_answered_at = models.DateTimeField(_('thời điểm trả lời đầu tiên'), )
+    last_answered_at = models.DateTimeField(_('thời điểm trả lời gần nhất'), )
+    attempts = models.IntegerField(verbose_name=_('số lượt làm'), default=0, )
+    correct_count = models.IntegerField(verbose_name=_('số lượt làm đúng'), default=0, )
+    last_is_correct = models.BooleanField(verbose_name=_('lượt làm gần nhất đúng không?'), default=False, )
+
+    objects = models.Manager()
+
+    class Meta:
+        constraints = [
+            # (user_id, question_id) is the index of 'question_id IN (SELECT question_id ... WHERE user_id = ...)'
+            models.UniqueConstraint(fields=['user', 'question'], name='practice_uqp_user_question_unique'),
+        ]
+
+    @staticmethod
+    def add_answer(answer):
+        progresses = UserQuestionProgress.objects.filter(user_id=answer.user_id, question_id=answer.question_id)
+        kwargs = {
+            'last_answered_at': answer.created_at,
+            'attempts': F('attempts') + 1,
+            'correct_count': F('correct_count') + (1 if answer.is_correct else 0),
+            'last_is_correct': answer.is_correct,
+        }
+        if progresses.update(**kwargs):
+            return
+        try:
+            with transaction.atomic():
+                UserQuestionProgress.objects.create(user_id=answer.user_id,
+                                                    question_id=answer.question_id,
+                                                    first_answered_at=answer.created_at,
+                                                    last_answered_at=answer.created_at,
+                                                    attempts=1,
+                                                    correct_count=1 if answer.is_correct else 0,
+                                                    last_is_correct=answer.is_correct)
+        except IntegrityError:
+            # created by a concurrent answer of the same user
+            progresses.update(**kwargs)
+
+    @staticmethod
+    def get_question_ids(user_id):
+        return UserQuestionProgress.objects.filter(user_id=user_id).values('question_id')
+
 
 class Comment(models.Model):
     content = models.TextField(verbose_name=_('nội dung'), default='', )
@@ -166,6 +371,24 @@ class Comment(models.Model):
 
     objects = models.Manager()
 
+    class Meta:
+        indexes = [
+            # comments of a question in a state, newest first: the comment panel of view_question seeks on it (keyset pagination)
+            models.Index(fields=['question', 'state', 'created_at', 'id'], name='practice_comment_timeline_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            was_visible = False
+            if not self._state.adding:
+                old_state = Comment.objects.select_for_update().filter(id=self.id).values_list('state', flat=True)
+                was_visible = bool(old_state) and old_state[0] != 'Locked'
+            super().save(*args, **kwargs)
+            is_visible = self.state != 'Locked'
+            if is_visible != was_visible:
+                Question.objects.filter(id=self.question_id).update(comment_count=F('comment_count') + (1 if is_visible else -1), version=F('version') + 1)
+                QuestionSnapshot.rebuild([self.question_id])
+
 
 class QuestionEvaluation(models.Model):
     question = models.ForeignKey(verbose_name=_('câu hỏi'), to=Question, on_delete=models.CASCADE, )
@@ -190,6 +413,180 @@ class QuestionEvaluation(models.Model):
 
     objects = models.Manager()
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding and self.question_rating is not None:
+                QuestionRatingSummary.add_rating(self)
+                QuestionSnapshot.rebuild([self.question_id])
+
+
+class QuestionRatingSummary(models.Model):
+    # maintained by QuestionEvaluation.save and practice.signals, rebuilt by the rebuild_question_rating_summaries command
+    question = models.OneToOneField(verbose_name=_('câu hỏi'), to=Question, on_delete=models.CASCADE, )
+    rating_sum = models.IntegerField(verbose_name=_('tổng số sao'), default=0, )
+    rating_count = models.IntegerField(verbose_name=_('số người bình chọn'), default=0, )
+    # {str(user_id): latest rating of the user}, only the latest rating of each user is counted
+    latest_ratings = models.JSONField(verbose_name=_('số sao gần nhất của từng người dùng'), default=dict, )
+
+    objects = models.Manager()
+
+    def set_latest_rating(self, user_id, rating):
+        key = str(user_id)
+        previous_rating = self.latest_ratings.pop(key, None)
+        if previous_rating is not None:
+            self.rating_sum -= previous_rating
+            self.rating_count -= 1
+        if rating is not None:
+            self.latest_ratings[key] = rating
+            self.rating_sum += rating
+            self.rating_count += 1
+
+    @staticmethod
+    def add_rating(evaluation):
+        with transaction.atomic():
+            summary, _ = QuestionRatingSummary.objects.select_for_update().get_or_create(question_id=evaluation.question_id)
+            summary.set_latest_rating(evaluation.user_id, evaluation.question_rating)
+            summary.save()
+
+    @staticmethod
+    def remove_rating(evaluation):
+        # the latest remaining rating of the user (if any) is counted again
+        with transaction.atomic():
+            summary = QuestionRatingSummary.objects.select_for_update().filter(question_id=evaluation.question_id).first()
+            if not summary or str(evaluation.user_id) not in summary.latest_ratings:
+                return
+            rating = (QuestionEvaluation.objects.filter(question_id=evaluation.question_id, user_id=evaluation.user_id, question_rating__isnull=False)
+                      .order_by('-created_at', '-id').values_list('question_rating', flat=True).first())
+            summary.set_latest_rating(evaluation.user_id, rating)
+            summary.save()
+
+
+class QuestionSnapshot(models.Model):
+    """
+    Denormalized read model of a question: what its detail page and its card show, read by primary key.
+    Rebuilt (QuestionSnapshot.rebuild) by Question.save, Answer.save, Comment.save, QuestionEvaluation.save and
+    process_new_question, dropped by practice.signals on deletes and media/hashtag changes, get_many builds missing snapshots.
+    """
+    question = models.OneToOneField(verbose_name=_('câu hỏi'), to=Question, on_delete=models.CASCADE, primary_key=True, )
+    # Question.version the snapshot was built from
+    version = models.IntegerField(verbose_name=_('phiên bản'), default=0, )
+    content = models.TextField(_('nội dung câu hỏi'), default='', )
+    state = models.CharField(verbose_name=_('trạng thái câu hỏi'), max_length=255, choices=Question.STATE_CHOICES, default='Pending', )
+    # [{'content': text}], which choices are true is not shown
+    choices = models.JSONField(verbose_name=_('các lựa chọn'), default=list, )
+    is_single_choice = models.BooleanField(verbose_name=_('chỉ có một lựa chọn đúng?'), default=True, )
+    tag_name = models.CharField(_('tên nhãn câu hỏi'), max_length=255, default='', )
+    user = models.ForeignKey(verbose_name=_('người tạo'), to=get_user_model(), on_delete=models.CASCADE, )
+    author_code = models.CharField(_('mã tác giả'), max_length=15, default='', )
+    display_hashtags = models.TextField(verbose_name=_('các hashtag'), default='', )
+    # {QuestionMedia.name: name of the file in the storage}
+    media = models.JSONField(verbose_name=_('các tệp media'), default=dict, )
+    rating_sum = models.IntegerField(verbose_name=_('tổng số sao'), default=0, )
+    rating_count = models.IntegerField(verbose_name=_('số người bình chọn'), default=0, )
+    answer_count = models.IntegerField(verbose_name=_('số lượt làm'), default=0, )
+    comment_count = models.IntegerField(verbose_name=_('số bình luận'), default=0, )
+    # datetime.datetime.now(datetime.timezone.utc)
+    created_at = models.DateTimeField(_('thời điểm tạo'), )
+
+    objects = models.Manager()
+
+    @property
+    def id(self):
+        # the templates and urls of a question use question.id
+        return self.question_id
+
+    @staticmethod
+    def build(question):
+        """
+        question: loaded with its user, tag, questionratingsummary, hashtag_set and questionmedia_set (see rebuild).
+        """
+        _, rating_count = question.get_rating()
+        return QuestionSnapshot(
+            question_id=question.id,
+            version=question.version,
+            content=question.content,
+            state=question.state,
+            choices=[{'content': choice['content']} for choice in question.choices],
+            is_single_choice=question.is_single_choice(),
+            tag_name=question.tag.name,
+            user_id=question.user_id,
+            author_code=question.user.code,
+            display_hashtags=question.get_display_hashtags(),
+            media={name: file.name for name, file in question.get_media_files().items()},
+            rating_sum=question.questionratingsummary.rating_sum if rating_count else 0,
+            rating_count=rating_count,
+            answer_count=question.answer_count,
+            comment_count=question.comment_count,
+            created_at=question.created_at,
+        )
+
+    @staticmethod
+    def rebuild(question_ids):
+        """
+        Builds and saves the snapshots of the questions, returns {question id: snapshot}.
+        """
+        questions = (Question.objects.filter(id__in=question_ids)
+                     .select_related('user', 'tag', 'questionratingsummary')
+                     .prefetch_related('hashtag_set', 'questionmedia_set'))
+        snapshots = [QuestionSnapshot.build(question) for question in questions]
+        QuestionSnapshot.objects.bulk_create(snapshots,
+                                             update_conflicts=True,
+                                             unique_fields=['question'],
+                                             update_fields=[field.name for field in QuestionSnapshot._meta.concrete_fields if not field.primary_key])
+        return {snapshot.question_id: snapshot for snapshot in snapshots}
+
+    @staticmethod
+    def drop(question_ids):
+        QuestionSnapshot.objects.filter(question_id__in=question_ids).delete()
+
+    @staticmethod
+    def get_many(question_ids, checking_versions=False):
+        """
+        Returns {question id: snapshot} of the existing questions, in one primary key lookup when their snapshots are built.
+        checking_versions (detail page): the questions are looked up too, a snapshot whose version, state or author is not
+        the one of its question (a write which skipped the rebuild hooks) is rebuilt, so that visibility is never decided
+        on a stale state, and the snapshot of a deleted question is not returned.
+        """
+        snapshots = QuestionSnapshot.objects.in_bulk(question_ids)
+        if checking_versions:
+            questions = {row[0]: row[1:] for row in Question.objects.filter(id__in=question_ids).values_list('id', 'version', 'state', 'user_id')}
+            snapshots = {question_id: snapshot for question_id, snapshot in snapshots.items()
+                         if questions.get(question_id) == (snapshot.version, snapshot.state, snapshot.user_id)}
+            question_ids = [question_id for question_id in question_ids if question_id in questions]
+        missing_ids = [question_id for question_id in question_ids if question_id not in snapshots]
+        if missing_ids:
+            snapshots.update(QuestionSnapshot.rebuild(missing_ids))
+        return snapshots
+
+    def get_display_hashtags(self):
+        return self.display_hashtags
+
+    def get_media_url(self, name):
+        file_name = self.media.get(name)
+        return QuestionMedia.file.field.storage.url(file_name) if file_name else ''
+
+    def get_latex_image(self):
+        return self.get_media_url('question_latex_image')
+
+    def get_addition_image(self):
+        return self.get_media_url('question_addition_image')
+
+    def get_video(self):
+        return self.get_media_url('question_video')
+
+    def get_audio(self):
+        return self.get_media_url('question_audio')
+
+    def get_display_media(self):
+        return ', '.join(str(label) for name, label in QuestionMedia.ATTACHMENT_LABELS if name in self.media)
+
+    def get_rating(self):
+        if not self.rating_count:
+            return 0, 0
+        return self.rating_sum / self.rating_count, self.rating_count
+
 
 class CommentEvaluation(models.Model):
     comment = models.ForeignKey(verbose_name=_('bình luận'), to=Comment, on_delete=models.CASCADE, )
@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from .stats import increase_stat
+
+# The rendered card of a question (practice/question_card.html) is cached by (question id, Question.version, timezone),
+# Question.version is bumped when the state, the number of answers or the number of comments changes,
+# so a cached card is never invalidated, it is only not looked up any more and expires after PRACTICE_QUESTION_CARD_CACHE_TIMEOUT.
+# The cache is CACHES[PRACTICE_QUESTION_CARD_CACHE_ALIAS]: a local memory cache for one process,
+# a file based (or any shared) cache for several processes or servers.
+# The hits and misses are counted in CACHES[PRACTICE_QUESTION_CARD_STATS_CACHE_ALIAS], a cache shared by the processes
+# so that the question_card_cache_stats command reads them.
+
+CARD_TEMPLATE_NAME = 'practice/question_card.html'
+HITS_KEY = 'practice.question_card.hits'
+MISSES_KEY = 'practice.question_card.misses'
+
+
+def get_cache():
+    return caches[getattr(settings, 'PRACTICE_QUESTION_CARD_CACHE_ALIAS', 'default')]
+
+
+def get_stats_cache():
+    return caches[getattr(settings, 'PRACTICE_QUESTION_CARD_STATS_CACHE_ALIAS', 'practice_stats')]
+
+
+def get_timeout():
+    return getattr(settings, 'PRACTICE_QUESTION_CARD_CACHE_TIMEOUT', 3600)
+
+
+def get_key(question, timezone_name):
+    # created_at is displayed in the current timezone
+    return f'practice.question_card:{question.id}:{question.version}:{timezone_name}'
+
+
+def get_stats():
+    """
+    Returns (hits, misses) since the last reset_stats.
+    """
+    stats = get_stats_cache().get_many([HITS_KEY, MISSES_KEY])
+    return stats.get(HITS_KEY, 0), stats.get(MISSES_KEY, 0)
+
+
+def reset_stats():
+    get_stats_cache().delete_many([HITS_KEY, MISSES_KEY])
+
+
+def render_question_cards(questions):
+    """
+    questions: QuestionSnapshot (or Question loaded by practice.views.load_question_cards)
+    Returns (cards, hits, misses), cards[i] is the html of questions[i].
+    """
+    timeout = get_timeout()
+    timezone_name = timezone.get_current_timezone_name()
+    context = {"suffix_utc": '' if not timezone_name == 'UTC' else 'UTC'}
+
+    if not timeout:
+        return [render_to_string(CARD_TEMPLATE_NAME, {**context, "question": question}) for question in questions], 0, len(questions)
+
+    cache = get_cache()
+    keys = [get_key(question, timezone_name) for question in questions]
+    cached_cards = cache.get_many(keys)
+    cards = []
+    rendered_cards = {}
+    for key, question in zip(keys, questions):
+        card = cached_cards.get(key)
+        if card is None:
+            card = render_to_string(CARD_TEMPLATE_NAME, {**context, "question": question})
+            rendered_cards[key] = card
+        cards.append(mark_safe(card))
+    if rendered_cards:
+        cache.set_many(rendered_cards, timeout=timeout)
+
+    misses = len(rendered_cards)
+    hits = len(cards) - misses
+    stats_cache = get_stats_cache()
+    increase_stat(stats_cache, HITS_KEY, hits)
+    increase_stat(stats_cache, MISSES_KEY, misses)
+    return cards, hits, misses
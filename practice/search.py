@@ -0,0 +1,106 @@
+import functools
+import operator
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from users.models import normalize_text
+
+# SQLite FTS5 index over Question.content, rowid = Question.id
+QUESTION_SEARCH_TABLE = 'practice_question_fts'
+
+
+def is_search_index_available():
+    return connection.vendor == 'sqlite'
+
+
+def ensure_question_search_index():
+    if not is_search_index_available():
+        return
+    with connection.cursor() as cursor:
+        # the content is folded by normalize_text before indexing, remove_diacritics handles what remains
+        cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {QUESTION_SEARCH_TABLE} "
+                       f"USING fts5(content, tokenize = 'unicode61 remove_diacritics 2')")
+
+
+def index_question(question_id: int, content: str):
+    if not is_search_index_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {QUESTION_SEARCH_TABLE} WHERE rowid = %s", [question_id])
+        cursor.execute(f"INSERT INTO {QUESTION_SEARCH_TABLE}(rowid, content) VALUES (%s, %s)", [question_id, normalize_text(content)])
+
+
+def unindex_question(question_id: int):
+    if not is_search_index_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {QUESTION_SEARCH_TABLE} WHERE rowid = %s", [question_id])
+
+
+def rebuild_question_search_index(rows, batch_size: int = 2000):
+    """
+    rows: iterable of (question_id, content)
+    Returns the number of indexed questions.
+    """
+    if not is_search_index_available():
+        return 0
+    count = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {QUESTION_SEARCH_TABLE}")
+        ensure_question_search_index()
+        batch = []
+        for question_id, content in rows:
+            batch.append((question_id, normalize_text(content)))
+            if len(batch) >= batch_size:
+                cursor.executemany(f"INSERT INTO {QUESTION_SEARCH_TABLE}(rowid, content) VALUES (%s, %s)", batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            cursor.executemany(f"INSERT INTO {QUESTION_SEARCH_TABLE}(rowid, content) VALUES (%s, %s)", batch)
+            count += len(batch)
+        cursor.execute(f"INSERT INTO {QUESTION_SEARCH_TABLE}({QUESTION_SEARCH_TABLE}) VALUES ('optimize')")
+    return count
+
+
+def build_match_query(keywords: list):
+    """
+    Each keyword becomes a quoted phrase whose last token is a prefix, keywords are joined by OR:
+    ['phương trình', 'đạo h'] -> '"phuong trinh"* OR "dao h"*'
+    Tokens only keep word characters, so user input can not inject FTS5 syntax.
+    Returns '' if no keyword has a token.
+    """
+    phrases = []
+    for keyword in keywords:
+        tokens = re.findall(r'\w+', normalize_text(keyword))
+        if tokens:
+            phrases.append(f'"{" ".join(tokens)}"*')
+    return ' OR '.join(phrases)
+
+
+def get_question_content_filter(keywords: list):
+    """
+    Returns a Q matching questions whose content contains one of the keywords, or None if there is no keyword.
+    """
+    if not is_search_index_available():
+        conditions = [Q(content__icontains=keyword) for keyword in keywords if keyword]
+        return functools.reduce(operator.or_, conditions) if conditions else None
+
+    match_query = build_match_query(keywords)
+    if not match_query:
+        return None
+    return Q(id__in=RawSQL(f"SELECT rowid FROM {QUESTION_SEARCH_TABLE} WHERE {QUESTION_SEARCH_TABLE} MATCH %s", [match_query]))
+
+
+def get_question_search_rank(keywords: list):
+    """
+    Returns an expression of the bm25 rank (smaller is more relevant) of the current question,
+    to annotate a queryset already filtered by get_question_content_filter.
+    """
+    match_query = build_match_query(keywords)
+    if not match_query or not is_search_index_available():
+        return None
+    return RawSQL(f"SELECT rank FROM {QUESTION_SEARCH_TABLE} WHERE {QUESTION_SEARCH_TABLE} MATCH %s "
+                  f"AND {QUESTION_SEARCH_TABLE}.rowid = practice_question.id", [match_query], output_field=FloatField())
@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import count_cache, search
+from .models import QuestionTag, Question, Hashtag, QuestionMedia, MediaBlob, Answer, UserQuestionProgress, Comment, QuestionEvaluation, QuestionRatingSummary, QuestionSnapshot, CommentEvaluation
+
+
+# deleting (also by cascade) runs in the transaction of the deletion, so counters stay consistent with it
+@receiver(post_delete, sender=Answer)
+def decrease_answer_count(sender, instance, **kwargs):
+    Question.objects.filter(id=instance.question_id).update(answer_count=F('answer_count') - 1, version=F('version') + 1)
+
+
+@receiver(post_delete, sender=Answer)
+def decrease_user_question_progress_attempts(sender, instance, **kwargs):
+    # only existing rows are changed, a cascade from a deleted user must not create one again;
+    # last_answered_at/last_is_correct are fixed by the rebuild_user_question_progress command
+    progresses = UserQuestionProgress.objects.filter(user_id=instance.user_id, question_id=instance.question_id)
+    progresses.filter(attempts__lte=1).delete()
+    progresses.update(attempts=F('attempts') - 1, correct_count=F('correct_count') - (1 if instance.is_correct else 0))
+
+
+@receiver(post_delete, sender=Comment)
+def decrease_comment_count(sender, instance, **kwargs):
+    if instance.state != 'Locked':
+        Question.objects.filter(id=instance.question_id).update(comment_count=F('comment_count') - 1, version=F('version') + 1)
+
+
+@receiver(post_delete, sender=QuestionEvaluation)
+def remove_question_rating(sender, instance, **kwargs):
+    if instance.question_rating is not None:
+        QuestionRatingSummary.remove_rating(instance)
+
+
+@receiver(post_delete, sender=QuestionMedia)
+def remove_media_blob_reference(sender, instance, **kwargs):
+    if instance.file:
+        MediaBlob.remove_reference(instance.file.name)
+
+
+# snapshots are dropped rather than rebuilt on deletes (a cascade may be deleting the question), QuestionSnapshot.get_many rebuilds them
+@receiver(post_delete, sender=Answer)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=QuestionEvaluation)
+def drop_question_snapshot(sender, instance, **kwargs):
+    QuestionSnapshot.drop([instance.question_id])
+
+
+def change_questions(question_ids):
+    # media and hashtags are shown on the cards, which are cached by Question.version (practice/question_cards.py)
+    Question.objects.filter(id__in=question_ids).update(version=F('version') + 1)
+    QuestionSnapshot.drop(question_ids)
+
+
+@receiver(post_save, sender=QuestionMedia)
+@receiver(post_delete, sender=QuestionMedia)
+def change_question_of_media(sender, instance, **kwargs):
+    change_questions([instance.question_id])
+
+
+@receiver(m2m_changed, sender=Hashtag.questions.through)
+def change_questions_of_hashtags(sender, instance, action, reverse, pk_set, **kwargs):
+    if isinstance(instance, Question):
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            change_questions([instance.id])
+    elif action in ('post_add', 'post_remove'):
+        change_questions(pk_set)
+    elif action == 'pre_clear':
+        # the questions of the hashtag are not known any more after the clear
+        change_questions(list(instance.questions.values_list('id', flat=True)))
+
+
+@receiver(post_save, sender=Question)
+def index_question_content(sender, instance, created, update_fields=None, **kwargs):
+    if created or update_fields is None or 'content' in update_fields:
+        search.index_question(instance.id, instance.content)
+
+
+@receiver(post_delete, sender=Question)
+def unindex_question_content(sender, instance, **kwargs):
+    search.unindex_question(instance.id)
+
+
+def create_question_search_index(sender, **kwargs):
+    search.ensure_question_search_index()
+
+
+# fields of a user which no listing filters nor counts: a login (update_last_login) saves last_login, User.save adds
+# the normalized fields to every partial save
+COUNT_CACHE_IGNORED_USER_FIELDS = frozenset(('last_login', 'normalized_name', 'normalized_code'))
+
+
+# versions are bumped once the write is committed: bumped in its transaction, a concurrent request could count the
+# rows before the commit and cache that count under the new version
+def bump_count_cache_version(sender, update_fields=None, **kwargs):
+    if sender is get_user_model() and update_fields and update_fields <= COUNT_CACHE_IGNORED_USER_FIELDS:
+        return
+    transaction.on_commit(lambda: count_cache.bump_version(sender))
+
+
+def bump_hashtag_count_cache_version(sender, **kwargs):
+    transaction.on_commit(lambda: count_cache.bump_version(Hashtag))
+
+
+for model in (QuestionTag, Question, Hashtag, Answer, UserQuestionProgress, Comment, QuestionEvaluation, CommentEvaluation, get_user_model()):
+    post_save.connect(bump_count_cache_version, sender=model, dispatch_uid=f'bump_count_cache_version.save.{model._meta.label_lower}')
+    post_delete.connect(bump_count_cache_version, sender=model, dispatch_uid=f'bump_count_cache_version.delete.{model._meta.label_lower}')
+m2m_changed.connect(bump_hashtag_count_cache_version, sender=Hashtag.questions.through, dispatch_uid='bump_count_cache_version.hashtag_questions')
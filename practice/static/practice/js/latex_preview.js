@@ -0,0 +1,37 @@
+function pollLatexImage() {
+    const pending_element = document.querySelector("#id_latex_pending[data-status-url]");
+    if (!pending_element) {
+        return;
+    }
+    const image_element = document.querySelector("#id_latex_image");
+    let remaining_polls = 60;
+
+    function poll() {
+        fetch(pending_element.dataset.statusUrl, {headers: {"Accept": "application/json"}})
+            .then((response) => response.json())
+            .then((job) => {
+                if (job.status === "done") {
+                    image_element.src = pending_element.dataset.baseUrl + job.url;
+                    image_element.hidden = false;
+                    pending_element.remove();
+                } else if (job.status === "failed") {
+                    pending_element.textContent = job.error;
+                    pending_element.classList.add("error");
+                } else if (job.status === "pending" && --remaining_polls > 0) {
+                    setTimeout(poll, 1000);
+                } else {
+                    pending_element.textContent = "Không thể tạo ảnh latex, vui lòng thử xem trước lại.";
+                    pending_element.classList.add("error");
+                }
+            })
+            .catch(() => {
+                if (--remaining_polls > 0) {
+                    setTimeout(poll, 1000);
+                }
+            });
+    }
+
+    setTimeout(poll, 500);
+}
+
+pollLatexImage();
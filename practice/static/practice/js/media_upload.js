@@ -0,0 +1,98 @@
+// Uploads the files chosen in new_question.html in chunks (practice/uploads.py) as soon as they are chosen,
+// the form then posts the upload id instead of the file. Without this script the form posts the files.
+const UPLOAD_CHUNK_SIZE = 1024 * 1024;
+const UPLOAD_MAX_RETRIES = 5;
+
+function getCsrfToken(form) {
+    return form.querySelector("input[name=csrfmiddlewaretoken]").value;
+}
+
+function uploadMediaFile(form, input) {
+    const status_element = document.querySelector(`#${input.id}_upload_status`);
+    const upload_id_element = form.querySelector(`input[name=${input.dataset.uploadKind}_upload_id]`);
+    const file = input.files[0];
+    const csrf_token = getCsrfToken(form);
+    upload_id_element.value = "";
+    if (!file) {
+        return;
+    }
+
+    function showStatus(text, is_error) {
+        status_element.textContent = text;
+        status_element.classList.toggle("error", Boolean(is_error));
+    }
+
+    function fail(response_json) {
+        showStatus(response_json && response_json.error ? response_json.error : "Không thể tải tệp lên, vui lòng chọn lại tệp.", true);
+        input.value = "";
+    }
+
+    const body = new FormData();
+    body.append("kind", input.dataset.uploadKind);
+    body.append("name", file.name);
+    body.append("size", file.size);
+    fetch(form.dataset.uploadUrl, {method: "POST", body: body, headers: {"X-CSRFToken": csrf_token}})
+        .then((response) => response.json().then((json) => ({ok: response.ok, json: json})))
+        .then(({ok, json}) => {
+            if (!ok) {
+                fail(json);
+                return;
+            }
+            let retries = 0;
+
+            function sendChunk(offset) {
+                if (offset >= file.size) {
+                    upload_id_element.value = json.upload_id;
+                    // the file is not posted again with the form
+                    input.value = "";
+                    showStatus(`Đã tải lên ${file.name}.`);
+                    return;
+                }
+                showStatus(`Đang tải lên ${file.name}: ${Math.floor(offset * 100 / file.size)}%`);
+                fetch(json.url, {
+                    method: "POST",
+                    body: file.slice(offset, offset + UPLOAD_CHUNK_SIZE),
+                    headers: {"X-CSRFToken": csrf_token, "Upload-Offset": String(offset), "Content-Type": "application/octet-stream"},
+                })
+                    .then((response) => response.json().then((chunk_json) => ({status: response.status, chunk_json: chunk_json})))
+                    .then(({status, chunk_json}) => {
+                        if (status === 200 || (status === 409 && chunk_json.offset !== null)) {
+                            retries = 0;
+                            sendChunk(chunk_json.offset);
+                        } else {
+                            fail(chunk_json);
+                        }
+                    })
+                    .catch(() => resume());
+            }
+
+            function resume() {
+                // the server keeps the bytes it received, the upload goes on from its offset
+                if (++retries > UPLOAD_MAX_RETRIES) {
+                    fail(null);
+                    return;
+                }
+                setTimeout(() => {
+                    fetch(json.url, {headers: {"Accept": "application/json"}})
+                        .then((response) => response.json())
+                        .then((state) => state.offset === undefined ? fail(state) : sendChunk(state.offset))
+                        .catch(() => resume());
+                }, 1000 * retries);
+            }
+
+            sendChunk(0);
+        })
+        .catch(() => fail(null));
+}
+
+function setUpMediaUploads() {
+    const form = document.querySelector("form[data-upload-url]");
+    if (!form) {
+        return;
+    }
+    form.querySelectorAll("input[type=file][data-upload-kind]").forEach((input) => {
+        input.addEventListener("change", () => uploadMediaFile(form, input));
+    });
+}
+
+setUpMediaUploads();
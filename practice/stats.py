@@ -0,0 +1,20 @@
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+# Counters of the server processes (question card cache hits, LaTeX renders...) kept in a cache, read and reset by
+# management commands, so the cache must be shared by the processes (see is_shared_cache).
+
+
+def is_shared_cache(cache):
+    # the counters of a local memory cache are only seen by the process which increases them, not by a management command
+    return not isinstance(cache, (LocMemCache, DummyCache))
+
+
+def increase_stat(cache, key, delta):
+    if not delta:
+        return
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if not cache.add(key, delta, timeout=None):
+            cache.incr(key, delta)
@@ -1,3 +1,535 @@
-from django.test import TestCase
+import datetime
+import hashlib
+import io
+import json
+import os
+import pathlib
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import types
+from unittest import mock
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import urlsafe_base64_encode
+
+from users.models import User
+
+from . import count_cache, latex, media, uploads
+from .media import hash_file
+from .models import QuestionTag, Question, QuestionMedia, Answer, Comment, QuestionSnapshot
+from .views import decode_cursor, encode_cursor, load_question_cards
+
 
 # Create your tests here.
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QuestionListQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = User.objects.create_user(email='viewer@example.com', name='Viewer', password='12345678')
+        tag = QuestionTag.objects.create(name='Toán')
+        created_at = datetime.datetime.now(datetime.timezone.utc)
+        for i in range(60):
+            author = User.objects.create_user(email=f'author{i}@example.com', name=f'Author {i}', password='12345678')
+            question = Question.objects.create(
+                content=f'Câu hỏi {i}',
+                state='Approved',
+                choices=[{'content': 'a', 'is_true': True}, {'content': 'b', 'is_true': False}],
+                tag=tag,
+                user=author,
+                hashtags=f'hashtag{i},chung',
+                created_at=created_at + datetime.timedelta(seconds=i),
+            )
+            question.set_hashtags([f'hashtag{i}', 'chung'])
+
+    def count_queries_of_page(self, limit):
+        # the first request stores the limit in the session, the measured one does not write the session
+        self.client.get(f"{reverse('practice:view_unanswered_questions')}?tid=-1&limit={limit}&offset=1")
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f"{reverse('practice:view_unanswered_questions')}?tid=-1&limit={limit}&offset=1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['questions']), limit)
+        return len(context.captured_queries)
+
+    def test_loading_a_page_of_cards_takes_three_queries(self):
+        # 1 query for the questions joined with their authors and tags, 1 for their hashtags, 1 for their media
+        with self.assertNumQueries(3):
+            questions = list(load_question_cards(Question.objects.order_by('-created_at'))[:50])
+            for question in questions:
+                self.assertTrue(question.user.code)
+                self.assertTrue(question.tag.name)
+                self.assertIn('#chung', question.get_display_hashtags())
+                self.assertEqual(question.get_display_media(), '')
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        self.client.force_login(self.viewer)
+        self.assertEqual(self.count_queries_of_page(4), self.count_queries_of_page(50))
+
+    def test_page_renders_author_code_and_hashtags(self):
+        self.client.force_login(self.viewer)
+        response = self.client.get(f"{reverse('practice:view_unanswered_questions')}?tid=-1&limit=50&offset=1")
+        question = Question.objects.order_by('-created_at')[0]
+        self.assertContains(response, question.user.code)
+        self.assertContains(response, '#chung')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class NewQuestionMediaTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        tmp_media_root = os.path.join(media_root, 'tmp')
+        os.makedirs(tmp_media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root, TMP_MEDIA_ROOT=tmp_media_root))
+
+        self.user = User.objects.create_user(email='author@example.com', name='Author', password='12345678')
+        self.tag = QuestionTag.objects.create(name='Toán')
+        self.client.force_login(self.user)
+
+        # a preview image as process_new_question saves it: <%Y%m%d%H%M%S%f><user code without '#'>addition_<name>
+        filename = f"{datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%d%H%M%S%f')}{self.user.code[1:]}addition_hinh.png"
+        self.preview_pathname = os.path.join(settings.TMP_MEDIA_ROOT, filename)
+        with open(self.preview_pathname, 'wb') as f:
+            f.write(b'\x89PNG\r\n\x1a\n' + b'0' * 100)
+        with open(f'{self.preview_pathname}.sha256', 'w', encoding='ascii') as f:
+            f.write(hash_file(self.preview_pathname))
+        self.params = {
+            'content': 'Câu hỏi có ảnh',
+            'tag_id': self.tag.id,
+            'choice_content_1': 'a',
+            'choice_is_true_1': 'on',
+            'choice_content_2': 'b',
+            'using_old_image': 'on',
+            'old_addition_image_url': settings.TMP_MEDIA_URL + filename,
+        }
+
+    def test_submit_promotes_the_preview_image(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('practice:process_new_question'), self.params)
+        self.assertEqual(response.status_code, 302)
+        question_media = QuestionMedia.objects.get(question__content='Câu hỏi có ảnh', name='question_addition_image')
+        self.assertTrue(question_media.file.storage.exists(question_media.file.name))
+        self.assertFalse(os.path.exists(self.preview_pathname))
+        self.assertFalse(os.path.exists(f'{self.preview_pathname}.sha256'))
+
+    def test_failed_submit_keeps_the_preview_image(self):
+        with self.captureOnCommitCallbacks(execute=True), \
+                mock.patch.object(QuestionMedia, 'save', side_effect=DatabaseError('media')):
+            with self.assertRaises(DatabaseError):
+                self.client.post(reverse('practice:process_new_question'), self.params)
+        self.assertFalse(Question.objects.filter(content='Câu hỏi có ảnh').exists())
+        self.assertTrue(os.path.exists(self.preview_pathname))
+        self.assertTrue(os.path.exists(f'{self.preview_pathname}.sha256'))
+
+
+@override_settings(PRACTICE_LATEX_TIMEOUT=10, PRACTICE_LATEX_WORKERS=2, PRACTICE_LATEX_MAX_QUEUED=32)
+class LatexJobStateTests(TestCase):
+    def setUp(self):
+        tmp_media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_media_root)
+        self.enterContext(override_settings(TMP_MEDIA_ROOT=tmp_media_root))
+        self.job_id = latex.get_key('$x$')
+        self.pending_pathname = latex.get_pathname(self.job_id, '.pending')
+        self.pending_pathname.parent.mkdir(parents=True)
+
+    def write_marker(self, marker, age):
+        self.pending_pathname.write_text(marker, encoding='utf-8')
+        mtime = datetime.datetime.now().timestamp() - age
+        os.utime(self.pending_pathname, (mtime, mtime))
+
+    def test_queued_job_is_pending_while_a_full_queue_can_wait(self):
+        # 32 jobs on 2 workers of 10 seconds each
+        self.write_marker(latex.QUEUED_MARKER, 100)
+        self.assertEqual(latex.get_state(self.job_id)[0], latex.PENDING)
+        self.write_marker(latex.QUEUED_MARKER, 200)
+        self.assertIsNone(latex.get_state(self.job_id)[0])
+
+    def test_running_job_is_pending_for_twice_the_timeout(self):
+        self.write_marker(latex.RUNNING_MARKER, 15)
+        self.assertEqual(latex.get_state(self.job_id)[0], latex.PENDING)
+        self.write_marker(latex.RUNNING_MARKER, 25)
+        self.assertIsNone(latex.get_state(self.job_id)[0])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class CountCacheVersionTests(TestCase):
+    def get_version(self, model):
+        return count_cache.get_cache().get(count_cache.get_version_key(model), 0)
+
+    def test_version_is_bumped_once_committed(self):
+        version = self.get_version(QuestionTag)
+        with self.captureOnCommitCallbacks() as callbacks:
+            QuestionTag.objects.create(name='Lý')
+            self.assertEqual(self.get_version(QuestionTag), version)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.get_version(QuestionTag), version + 1)
+
+    def test_login_does_not_bump_the_users(self):
+        User.objects.create_user(email='login@example.com', name='Login', password='12345678')
+        with self.captureOnCommitCallbacks(execute=True):
+            version = self.get_version(User)
+            self.assertTrue(self.client.login(email='login@example.com', password='12345678'))
+        self.assertEqual(self.get_version(User), version)
+
+
+class MediaRangeTests(SimpleTestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        with os.fdopen(fd, 'wb') as f:
+            f.write(bytes(range(100)))
+        self.addCleanup(os.remove, self.path)
+        self.etag = media.get_etag(os.stat(self.path))
+
+    def serve(self, **headers):
+        request = RequestFactory().get('/media/', **headers)
+        response = media.serve_file(request, self.path, 'videos/practice/bài giảng.mp4', 'video/mp4')
+        self.addCleanup(response.close)
+        return response
+
+    def test_parse_range(self):
+        self.assertEqual(media.parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(media.parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(media.parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(media.parse_range('bytes=90-200', 100), (90, 99))
+        self.assertIs(media.parse_range('bytes=100-', 100), False)
+        self.assertIs(media.parse_range('bytes=9-0', 100), False)
+        self.assertIs(media.parse_range('bytes=-0', 100), False)
+        self.assertIsNone(media.parse_range('bytes=0-1,5-6', 100))
+        self.assertIsNone(media.parse_range('items=0-9', 100))
+        self.assertIsNone(media.parse_range('', 100))
+
+    def test_range_is_served_as_partial_content(self):
+        response = self.serve(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+
+    def test_unsatisfiable_range(self):
+        response = self.serve(HTTP_RANGE='bytes=100-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_if_range_of_another_version_serves_the_whole_file(self):
+        response = self.serve(HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE='"0-0"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(100)))
+        response = self.serve(HTTP_RANGE='bytes=10-19', HTTP_IF_RANGE=self.etag)
+        self.assertEqual(response.status_code, 206)
+
+    def test_not_modified(self):
+        response = self.serve(HTTP_IF_NONE_MATCH=self.etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], self.etag)
+
+    @override_settings(PRACTICE_MEDIA_OFFLOAD='x-accel', PRACTICE_MEDIA_OFFLOAD_PREFIX='/protected-media/')
+    def test_x_accel_redirect_is_percent_encoded(self):
+        response = self.serve()
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/videos/practice/b%C3%A0i%20gi%E1%BA%A3ng.mp4')
+
+
+class LatexRenderFallbackTests(SimpleTestCase):
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workdir)
+        self.pathname = pathlib.Path(self.workdir, 'render.png')
+
+    def test_any_mathtext_failure_falls_back_to_latex(self):
+        matplotlib = types.ModuleType('matplotlib')
+        mathtext = types.ModuleType('matplotlib.mathtext')
+        mathtext.math_to_image = mock.Mock(side_effect=RuntimeError('no font'))
+        font_manager = types.ModuleType('matplotlib.font_manager')
+        font_manager.FontProperties = mock.Mock()
+        matplotlib.mathtext, matplotlib.font_manager = mathtext, font_manager
+        modules = {'matplotlib': matplotlib, 'matplotlib.mathtext': mathtext, 'matplotlib.font_manager': font_manager}
+        with mock.patch.dict(sys.modules, modules), \
+                mock.patch.object(latex.LatexRenderer, 'render') as latex_render, \
+                mock.patch.object(latex, 'increase_stat') as increase_stat:
+            self.assertEqual(latex.render_content('$x^2$', self.pathname), 'latex')
+        latex_render.assert_called_once_with('$x^2$', self.pathname)
+        self.assertIn(mock.call(mock.ANY, latex.get_fallbacks_key('mathtext', 'render_error'), 1), increase_stat.call_args_list)
+
+    def test_error_of_the_content_is_compiled_once(self):
+        failed = subprocess.CompletedProcess([], 1, stdout=b'! Undefined control sequence.\nl.3 $\\foo$')
+        format_pathname = pathlib.Path(self.workdir, 'preamble.fmt')
+        with mock.patch.object(latex, 'build_format', return_value=format_pathname), \
+                mock.patch.object(latex, 'run', return_value=failed) as run:
+            with self.assertRaises(latex.RenderError) as context:
+                latex.render_to_file('$\\foo$', self.pathname, using_format=True)
+        self.assertEqual(context.exception.code, latex.SYNTAX_ERROR)
+        self.assertEqual(run.call_count, 1)
+
+    def test_format_error_compiles_the_whole_document(self):
+        format_failed = subprocess.CompletedProcess([], 1, stdout=b'---! preamble.fmt was written by tex')
+        succeeded = subprocess.CompletedProcess([], 0, stdout=b'')
+        format_pathname = pathlib.Path(self.workdir, 'preamble.fmt')
+
+        def run(command, cwd, deadline):
+            if command[0] == 'dvipng':
+                pathlib.Path(cwd, 'texput.png').write_bytes(b'png')
+                return succeeded
+            return format_failed if any(arg.startswith('-fmt=') for arg in command) else succeeded
+
+        with mock.patch.object(latex, 'build_format', return_value=format_pathname), \
+                mock.patch.object(latex, 'drop_format') as drop_format, \
+                mock.patch.object(latex, 'run', side_effect=run):
+            latex.render_to_file('$x$', self.pathname, using_format=True)
+        drop_format.assert_called_once_with()
+        self.assertEqual(self.pathname.read_bytes(), b'png')
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QuestionCounterTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(email='author@example.com', name='Author', password='12345678')
+        self.user = User.objects.create_user(email='user@example.com', name='User', password='12345678')
+        self.question = Question.objects.create(
+            content='Câu hỏi',
+            state='Approved',
+            choices=[{'content': 'a', 'is_true': True}, {'content': 'b', 'is_true': False}],
+            tag=QuestionTag.objects.create(name='Toán'),
+            user=self.author,
+            hashtags='',
+            created_at=datetime.datetime.now(datetime.timezone.utc),
+        )
+
+    def create_answer(self):
+        return Answer.objects.create(question=self.question, user=self.user, choices=[0], is_correct=True,
+                                     created_at=datetime.datetime.now(datetime.timezone.utc))
+
+    def create_comment(self, state='Normal'):
+        now = datetime.datetime.now(datetime.timezone.utc)
+        return Comment.objects.create(question=self.question, user=self.user, content='Bình luận', state=state, created_at=now, updated_at=now)
+
+    def assert_counters(self, answer_count, comment_count):
+        """
+        Checks the counters of the question against its rows, and its snapshot against the question.
+        Returns the version of the question.
+        """
+        question = Question.objects.get(id=self.question.id)
+        self.assertEqual(question.answer_count, answer_count)
+        self.assertEqual(question.answer_count, question.answer_set.count())
+        self.assertEqual(question.comment_count, comment_count)
+        self.assertEqual(question.comment_count, question.comment_set.exclude(state='Locked').count())
+        snapshot = QuestionSnapshot.get_many([question.id], checking_versions=True)[question.id]
+        self.assertEqual((snapshot.version, snapshot.answer_count, snapshot.comment_count),
+                         (question.version, question.answer_count, question.comment_count))
+        return question.version
+
+    def test_answers(self):
+        version = self.assert_counters(0, 0)
+        answer = self.create_answer()
+        self.create_answer()
+        answered_version = self.assert_counters(2, 0)
+        self.assertGreater(answered_version, version)
+
+        answer.delete()
+        self.assertGreater(self.assert_counters(1, 0), answered_version)
+
+    def test_comments_created_and_deleted(self):
+        comment = self.create_comment()
+        self.create_comment(state='Locked')
+        version = self.assert_counters(0, 1)
+
+        comment.content = 'Sửa'
+        comment.save()
+        # the counter and the version only change with the visibility of the comment
+        self.assertEqual(self.assert_counters(0, 1), version)
+
+        Comment.objects.filter(state='Locked').get().delete()
+        self.assertEqual(self.assert_counters(0, 1), version)
+        comment.delete()
+        self.assertGreater(self.assert_counters(0, 0), version)
+
+    def test_comments_locked_and_unlocked(self):
+        comment = self.create_comment()
+        self.create_comment()
+        version = self.assert_counters(0, 2)
+
+        comment.state = 'Locked'
+        comment.save()
+        locked_version = self.assert_counters(0, 1)
+        self.assertGreater(locked_version, version)
+        # locking again does not count the comment twice
+        comment.save()
+        self.assertEqual(self.assert_counters(0, 1), locked_version)
+
+        comment.state = 'Normal'
+        comment.save()
+        self.assertGreater(self.assert_counters(0, 2), locked_version)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QuestionCursorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.viewer = User.objects.create_user(email='viewer@example.com', name='Viewer', password='12345678')
+        author = User.objects.create_user(email='author@example.com', name='Author', password='12345678')
+        tag = QuestionTag.objects.create(name='Toán')
+        created_at = datetime.datetime.now(datetime.timezone.utc)
+        cls.matching_ids = set()
+        for i in range(24):
+            # every other question is about 'đạo hàm', some of them with the same rank
+            content = f'Câu hỏi {i} ' + ('đạo hàm ' * (i % 3 + 1) if i % 2 else 'tích phân')
+            question = Question.objects.create(content=content, state='Approved', choices=[{'content': 'a', 'is_true': True}],
+                                               tag=tag, user=author, hashtags='', created_at=created_at + datetime.timedelta(seconds=i))
+            if i % 2:
+                cls.matching_ids.add(question.id)
+
+    def setUp(self):
+        self.client.force_login(self.viewer)
+
+    def get_api_page(self, **params):
+        response = self.client.get(reverse('practice:api_view_questions'), params)
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response.status_code, json.loads(content)
+
+    def get_all_ids(self, limit, **params):
+        ids = []
+        cursor = ''
+        while True:
+            status_code, page = self.get_api_page(limit=limit, cursor=cursor, **params)
+            self.assertEqual(status_code, 200)
+            ids.extend(question['id'] for question in page['questions'])
+            cursor = page['next_cursor']
+            if not cursor:
+                return ids
+
+    def test_tampered_cursors_are_rejected(self):
+        order_bys = ['-created_at', '-id']
+        queryset = Question.objects.all()
+        question = Question.objects.first()
+        self.assertIsNotNone(decode_cursor(encode_cursor(order_bys, question, 'next'), order_bys, queryset))
+
+        def encode(cursor):
+            return urlsafe_base64_encode(json.dumps(cursor).encode('utf-8'))
+
+        for cursor in ('!!!', urlsafe_base64_encode(b'\xff\xfe'), urlsafe_base64_encode(b'not json'), encode([1, 2]),
+                       encode({'order_bys': order_bys, 'values': [question.created_at.isoformat()], 'direction': 'next'}),
+                       encode({'order_bys': order_bys, 'values': [question.created_at.isoformat(), question.id], 'direction': 'up'}),
+                       encode({'order_bys': order_bys, 'values': ['yesterday', question.id], 'direction': 'next'}),
+                       encode({'order_bys': order_bys, 'values': [question.created_at.isoformat(), 'one'], 'direction': 'next'}),
+                       encode({'order_bys': order_bys, 'values': [question.created_at.isoformat(), {'id': 1}], 'direction': 'next'}),
+                       encode({'order_bys': order_bys, 'values': [question.created_at.isoformat(), True], 'direction': 'next'})):
+            self.assertIsNone(decode_cursor(cursor, order_bys, queryset), cursor)
+            status_code, page = self.get_api_page(cursor=cursor)
+            self.assertEqual(status_code, 400)
+            self.assertIn('error', page)
+
+    def test_cursor_of_another_order_is_rejected(self):
+        question = Question.objects.first()
+        cursor = encode_cursor(['-created_at', '-id'], question, 'next')
+        self.assertIsNone(decode_cursor(cursor, ['created_at', 'id'], Question.objects.all()))
+        self.assertEqual(self.get_api_page(cursor=cursor, sorter_with_created_at='+')[0], 400)
+        # a content filter orders by rank first
+        self.assertEqual(self.get_api_page(cursor=cursor, filter_by_content='đạo hàm')[0], 400)
+        self.assertEqual(self.get_api_page(cursor=cursor)[0], 200)
+
+    def test_pages_by_cursor(self):
+        ids = self.get_all_ids(limit=5)
+        self.assertEqual(ids, self.get_all_ids(limit=100))
+        self.assertEqual(len(ids), 24)
+
+    def test_pages_by_rank_with_content_filter(self):
+        ids = self.get_all_ids(limit=3, filter_by_content='đạo hàm')
+        self.assertEqual(ids, self.get_all_ids(limit=100, filter_by_content='đạo hàm'))
+        self.assertEqual(set(ids), self.matching_ids)
+        self.assertEqual(len(ids), len(self.matching_ids))
+        # the questions repeating the keywords the most come first
+        counts = [Question.objects.get(id=question_id).content.count('đạo hàm') for question_id in ids]
+        self.assertEqual(counts, sorted(counts, reverse=True))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], PRACTICE_UPLOAD_MAX_CHUNK_SIZE=64)
+class MediaUploadChunkTests(TestCase):
+    content = b'\x89PNG\r\n\x1a\n' + bytes(range(92))
+
+    def setUp(self):
+        tmp_media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_media_root)
+        self.enterContext(override_settings(TMP_MEDIA_ROOT=tmp_media_root))
+        self.user = User.objects.create_user(email='uploader@example.com', name='Uploader', password='12345678')
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('practice:process_new_question_media_upload'), {'kind': 'image', 'name': 'hình.png', 'size': len(self.content)})
+        self.assertEqual(response.status_code, 201)
+        self.upload_id, self.url = response.json()['upload_id'], response.json()['url']
+        self.upload = uploads.get_upload(self.client.session, self.upload_id)
+
+    def send(self, offset, chunk):
+        return self.client.post(self.url, chunk, content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset))
+
+    def get_file_content(self):
+        return uploads.get_pathname(self.upload['filename']).read_bytes()
+
+    def test_chunks_in_order_complete_the_upload(self):
+        self.assertEqual(self.send(0, self.content[:60]).json()['offset'], 60)
+        response = self.send(60, self.content[60:])
+        self.assertEqual(response.json(), {'upload_id': self.upload_id, 'offset': 100, 'size': 100, 'completed': True})
+        self.assertEqual(self.get_file_content(), self.content)
+        self.assertEqual(media.get_preview_digest(uploads.get_pathname(self.upload['filename'])), hashlib.sha256(self.content).hexdigest())
+
+    def test_chunk_out_of_order(self):
+        response = self.send(60, self.content[60:])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 0)
+        self.assertEqual(self.get_file_content(), b'')
+
+    def test_duplicate_chunk(self):
+        self.send(0, self.content[:60])
+        response = self.send(0, self.content[:60])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 60)
+        self.assertEqual(self.get_file_content(), self.content[:60])
+
+    def test_oversized_chunks(self):
+        response = self.send(0, self.content[:65])
+        self.assertEqual((response.status_code, response.json()['code']), (400, uploads.CHUNK_SIZE_ERROR))
+        self.send(0, self.content[:60])
+        # longer than the announced size
+        response = self.send(60, self.content[60:] + b'0')
+        self.assertEqual((response.status_code, response.json()['code']), (413, uploads.SIZE_ERROR))
+        self.assertEqual(self.get_file_content(), self.content[:60])
+
+    def test_wrong_magic_removes_the_upload(self):
+        response = self.send(0, b'GIF89a' + self.content[6:60])
+        self.assertEqual((response.status_code, response.json()['code']), (415, uploads.TYPE_ERROR))
+        self.assertFalse(uploads.get_pathname(self.upload['filename']).exists())
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.send(0, self.content[:60]).status_code, 404)
+
+    def test_concurrent_chunks_at_the_same_offset(self):
+        reading = threading.Event()
+        resuming = threading.Event()
+
+        class SlowStream:
+            # the first request is still receiving its chunk when the second one arrives
+            def __init__(self, data):
+                self.data = data
+
+            def read(self, size):
+                reading.set()
+                resuming.wait(5)
+                data, self.data = self.data[:size], self.data[size:]
+                return data
+
+        results = {}
+        first = threading.Thread(target=lambda: results.update(first=uploads.append(self.upload, 0, SlowStream(self.content[:60]), 60)))
+        first.start()
+        reading.wait(5)
+        second = threading.Thread(target=lambda: results.update(second=uploads.append(self.upload, 0, io.BytesIO(b'\x89PNG\r\n\x1a\n' + b'x' * 52), 60)))
+        second.start()
+        # the second request reaches the offset check while the first one is writing
+        second.join(0.2)
+        resuming.set()
+        first.join(5)
+        second.join(5)
+        self.assertEqual(results['first'], (60, uploads.OK))
+        self.assertEqual(results['second'], (60, uploads.OFFSET_ERROR))
+        self.assertEqual(self.get_file_content(), self.content[:60])
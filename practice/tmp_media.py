@@ -0,0 +1,162 @@
+import os
+import re
+import threading
+import time
+
+from django.conf import settings
+
+from . import latex
+from .media import DIGEST_SUFFIX
+
+# Preview files of process_new_question are written in TMP_MEDIA_ROOT as <%Y%m%d%H%M%S%f><user code without '#'>[addition_]<name>
+# (with their <file>.sha256, see practice/media.py). sweep removes
+#   the files older than PRACTICE_TMP_MEDIA_MAX_AGE seconds,
+#   then the oldest files of a user above PRACTICE_TMP_MEDIA_USER_MAX_SIZE bytes,
+#   then the oldest files above PRACTICE_TMP_MEDIA_MAX_SIZE bytes for TMP_MEDIA_ROOT,
+# and evicts the LaTeX render cache (TMP_MEDIA_ROOT/latex, its own limit). Sub directories are not swept.
+# It runs with the sweep_tmp_media command (cron) or, if PRACTICE_TMP_MEDIA_SWEEP_INTERVAL is set, in a thread of each
+# server process started by the first request; concurrent sweeps only remove the same files.
+
+PREVIEW_FILENAME_PATTERN = re.compile(r'^\d{20}([0-9a-f]{6})')
+
+_sweeper = None
+_sweeper_lock = threading.Lock()
+
+
+def get_max_age():
+    return getattr(settings, 'PRACTICE_TMP_MEDIA_MAX_AGE', 24 * 3600)
+
+
+def get_user_max_size():
+    return getattr(settings, 'PRACTICE_TMP_MEDIA_USER_MAX_SIZE', 100 * 1024 * 1024)
+
+
+def get_max_size():
+    return getattr(settings, 'PRACTICE_TMP_MEDIA_MAX_SIZE', 2 * 1024 * 1024 * 1024)
+
+
+def get_sweep_interval():
+    return getattr(settings, 'PRACTICE_TMP_MEDIA_SWEEP_INTERVAL', 0)
+
+
+def get_user_code(filename):
+    match = PREVIEW_FILENAME_PATTERN.match(filename)
+    return match.group(1) if match else None
+
+
+class SweepResult:
+    def __init__(self):
+        self.removed_count = 0
+        self.removed_size = 0
+        self.kept_count = 0
+        self.kept_size = 0
+        self.evicted_latex_count = 0
+
+
+def remove_entry(entry, result, dry_run):
+    _, size, _, paths = entry
+    if not dry_run:
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    result.removed_count += 1
+    result.removed_size += size
+
+
+def scan(tmp_root, expired_at, result, dry_run):
+    """
+    Returns {preview file name: [mtime, size, user code, paths]} of the files which are not expired,
+    the expired ones are removed while the directory is read.
+    """
+    entries = {}
+    with os.scandir(tmp_root) as files:
+        for file in files:
+            try:
+                if not file.is_file(follow_symlinks=False):
+                    continue
+                stat = file.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                continue
+            # a digest goes with its file
+            name = file.name[:-len(DIGEST_SUFFIX)] if file.name.endswith(DIGEST_SUFFIX) else file.name
+            entry = entries.get(name)
+            if entry is None:
+                entries[name] = [stat.st_mtime, stat.st_size, get_user_code(name), [file.path]]
+            else:
+                entry[0] = max(entry[0], stat.st_mtime)
+                entry[1] += stat.st_size
+                entry[3].append(file.path)
+
+    # a file and its digest are only known together once the directory is read
+    for name, entry in list(entries.items()):
+        if entry[0] < expired_at:
+            remove_entry(entry, result, dry_run)
+            del entries[name]
+    return entries
+
+
+def sweep(dry_run=False):
+    result = SweepResult()
+    tmp_root = settings.TMP_MEDIA_ROOT
+    if not os.path.isdir(tmp_root):
+        return result
+
+    entries = sorted(scan(tmp_root, time.time() - get_max_age(), result, dry_run).values(), key=lambda entry: entry[0])
+
+    user_max_size = get_user_max_size()
+    user_sizes = {}
+    for entry in entries:
+        if entry[2] is not None:
+            user_sizes[entry[2]] = user_sizes.get(entry[2], 0) + entry[1]
+    kept_entries = []
+    # oldest first: the files of the preview a user is filling in are kept
+    for entry in entries:
+        user_code = entry[2]
+        if user_code is not None and user_sizes[user_code] > user_max_size:
+            user_sizes[user_code] -= entry[1]
+            remove_entry(entry, result, dry_run)
+        else:
+            kept_entries.append(entry)
+
+    total_size = sum(entry[1] for entry in kept_entries)
+    max_size = get_max_size()
+    for i, entry in enumerate(kept_entries):
+        if total_size <= max_size:
+            kept_entries = kept_entries[i:]
+            break
+        total_size -= entry[1]
+        remove_entry(entry, result, dry_run)
+    else:
+        kept_entries = []
+
+    result.kept_count = len(kept_entries)
+    result.kept_size = total_size
+    if not dry_run:
+        result.evicted_latex_count = latex.evict(latex.get_max_size())
+    return result
+
+
+def run_sweeper(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            sweep()
+        except OSError:
+            # a failed sweep is retried at the next interval
+            pass
+
+
+def start_sweeper(**kwargs):
+    """
+    Starts the sweeping thread of the process once, connected to request_started by PracticeConfig.ready.
+    """
+    global _sweeper
+    interval = get_sweep_interval()
+    if not interval or _sweeper is not None:
+        return
+    with _sweeper_lock:
+        if _sweeper is None:
+            _sweeper = threading.Thread(target=run_sweeper, args=(interval,), name='tmp_media_sweeper', daemon=True)
+            _sweeper.start()
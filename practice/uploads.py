@@ -0,0 +1,205 @@
+import contextlib
+import datetime
+import os
+import pathlib
+import secrets
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+from django.conf import settings
+from django.utils.text import get_valid_filename
+
+from .media import DIGEST_SUFFIX, hash_file
+from .models import QuestionMedia
+
+# Resumable chunked uploads of the media of new_question.html (practice/js/media_upload.js):
+#   POST question/new/upload/ (kind, name, size) checks the extension and the size, creates the empty preview file and
+#     returns an upload id, kept in the session with the preview file name
+#   POST question/new/upload/<upload id>/ with the header Upload-Offset and the bytes of a chunk in the body appends them,
+#     the magic bytes are checked on the first chunk, the size can not go above the announced one
+#   GET question/new/upload/<upload id>/ returns the offset to resume from after an interrupted chunk
+# Chunks are written in place into the preview file of TMP_MEDIA_ROOT (named as process_new_question names the preview
+# files, so it is swept by practice.tmp_media), its digest is written once it is complete. The form then posts the
+# upload id instead of the file, process_new_question handles it as the file of a previous preview.
+# Concurrent chunks of an upload (a retried request while the first one is still running) are serialized by a lock on
+# the file: the offset is checked under the lock and the chunk is appended (O_APPEND), so only one of them is written.
+
+SESSION_KEY = 'practice_uploads'
+# uploads kept in the session, the oldest ones are forgotten (their files are swept)
+MAX_SESSION_UPLOADS = 20
+CHUNK_SIZE = 64 * 1024
+
+OK = 'ok'
+NOT_FOUND_ERROR = 'not_found'
+TYPE_ERROR = 'type'
+SIZE_ERROR = 'size'
+OFFSET_ERROR = 'offset'
+CHUNK_SIZE_ERROR = 'chunk_size'
+
+KINDS = {
+    # kind: (extensions, max size in MB, prefix of the preview file name after the user code)
+    'image': (('.png', '.jpg', '.jpeg'), QuestionMedia.MAX_IMAGE_SIZE, 'addition_'),
+    'video': (('.mp4',), QuestionMedia.MAX_VIDEO_SIZE, ''),
+    'audio': (('.mp3',), QuestionMedia.MAX_AUDIO_SIZE, ''),
+}
+# bytes needed to check the type of a file
+HEAD_SIZE = 12
+
+
+def get_max_chunk_size():
+    return getattr(settings, 'PRACTICE_UPLOAD_MAX_CHUNK_SIZE', 2 * 1024 * 1024)
+
+
+def get_max_size(kind):
+    return int(KINDS[kind][1] * 1024 * 1024)
+
+
+def is_valid_head(kind, extension, head):
+    if kind == 'image':
+        if extension == '.png':
+            return head.startswith(b'\x89PNG\r\n\x1a\n')
+        return head.startswith(b'\xff\xd8\xff')
+    if kind == 'video':
+        # ISO base media file: size of the first box then 'ftyp'
+        return head[4:8] == b'ftyp'
+    if kind == 'audio':
+        # ID3 tag or the sync bits of an MPEG audio frame
+        return head.startswith(b'ID3') or (len(head) >= 2 and head[0] == 0xff and head[1] & 0xe0 == 0xe0)
+    return False
+
+
+def get_pathname(filename):
+    return pathlib.Path(settings.TMP_MEDIA_ROOT, filename)
+
+
+def get_upload(session, upload_id):
+    uploads = session.get(SESSION_KEY)
+    if not isinstance(uploads, dict) or not isinstance(upload_id, str):
+        return None
+    return uploads.get(upload_id)
+
+
+def create(session, user_code, kind, name, size):
+    """
+    Returns (upload id, OK) or (None, error).
+    """
+    if kind not in KINDS:
+        return None, TYPE_ERROR
+    extensions, _, prefix = KINDS[kind]
+    name = os.path.basename(name or '').strip()
+    if not name.endswith(extensions):
+        return None, TYPE_ERROR
+    name = get_valid_filename(name)[-100:]
+    if not name.endswith(extensions):
+        return None, TYPE_ERROR
+    # same limit as the fields of process_new_question
+    if size <= 0 or size >= get_max_size(kind):
+        return None, SIZE_ERROR
+
+    filename = f"{datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%d%H%M%S%f')}{user_code[1:]}{prefix}{name}"
+    os.close(os.open(get_pathname(filename), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+
+    upload_id = secrets.token_urlsafe(16)
+    uploads = session.get(SESSION_KEY)
+    if not isinstance(uploads, dict):
+        uploads = {}
+    uploads[upload_id] = {'kind': kind, 'filename': filename, 'size': size}
+    while len(uploads) > MAX_SESSION_UPLOADS:
+        del uploads[next(iter(uploads))]
+    session[SESSION_KEY] = uploads
+    return upload_id, OK
+
+
+def get_offset(upload):
+    try:
+        return os.path.getsize(get_pathname(upload['filename']))
+    except OSError:
+        return None
+
+
+def is_completed(upload):
+    return os.path.exists(f"{get_pathname(upload['filename'])}{DIGEST_SUFFIX}")
+
+
+@contextlib.contextmanager
+def locked(f):
+    """
+    Holds an exclusive lock on the open file f, waiting for the chunk of another request to be written.
+    """
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return
+    # the first byte, whatever the size of the file
+    f.seek(0)
+    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+    try:
+        yield
+    finally:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def append(upload, offset, stream, length):
+    """
+    Writes length bytes read from stream at offset of the file of the upload.
+    Returns (offset of the file after the chunk, OK) or (offset of the file, error), a file of the wrong type is removed.
+    """
+    pathname = get_pathname(upload['filename'])
+    try:
+        # never created again here once it has been removed (wrong type, swept)
+        fd = os.open(pathname, os.O_WRONLY | os.O_APPEND | getattr(os, 'O_BINARY', 0))
+    except FileNotFoundError:
+        return None, NOT_FOUND_ERROR
+
+    with os.fdopen(fd, 'ab') as f, locked(f):
+        current_offset = os.fstat(f.fileno()).st_size
+        if offset != current_offset:
+            return current_offset, OFFSET_ERROR
+        if length <= 0 or length > get_max_chunk_size():
+            return current_offset, CHUNK_SIZE_ERROR
+        if offset + length > upload['size']:
+            return current_offset, SIZE_ERROR
+        if offset == 0 and length < min(HEAD_SIZE, upload['size']):
+            return current_offset, CHUNK_SIZE_ERROR
+
+        remaining = length
+        if offset == 0:
+            head = stream.read(min(HEAD_SIZE, remaining))
+            if not is_valid_head(upload['kind'], os.path.splitext(upload['filename'])[1], head):
+                os.remove(pathname)
+                return None, TYPE_ERROR
+            f.write(head)
+            remaining -= len(head)
+        while remaining > 0:
+            chunk = stream.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            f.write(chunk)
+            remaining -= len(chunk)
+        # an interrupted chunk keeps the bytes received, the client resumes from there
+        f.flush()
+        offset = os.fstat(f.fileno()).st_size
+
+        if offset == upload['size']:
+            with open(f'{pathname}{DIGEST_SUFFIX}', 'w', encoding='ascii') as digest_file:
+                digest_file.write(hash_file(pathname))
+    return offset, OK
+
+
+def get_completed_filename(session, upload_id, kind):
+    """
+    Returns the preview file name of a completed upload of kind, or None.
+    """
+    upload = get_upload(session, upload_id)
+    if upload is None or upload['kind'] != kind or not is_completed(upload):
+        return None
+    return upload['filename']
@@ -28,9 +28,14 @@ urlpatterns = [
     path('answer/new/<int:question_id>', views.process_new_answer, name='process_new_answer'),
 
     path('question/<int:question_id>/evaluation/new/', views.process_new_question_evaluation, name='process_new_question_evaluation'),
+    path('question/<int:question_id>/answer/', views.view_answer_history_in_question, name='view_answer_history_in_question'),
     path('question/<int:question_id>/comment/', views.process_comments_in_question, name='process_comments_in_question'),
     path('question/<int:question_id>', views.view_detail_question, name='view_detail_question'),
+    path('question/media/<path:name>', views.view_question_media, name='view_question_media'),
     path('question/new/', views.process_new_question, name='process_new_question'),
+    path('question/new/latex/<str:job_id>/', views.view_latex_job, name='view_latex_job'),
+    path('question/new/upload/', views.process_new_question_media_upload, name='process_new_question_media_upload'),
+    path('question/new/upload/<str:upload_id>/', views.process_question_media_upload_chunk, name='process_question_media_upload_chunk'),
     path('question/admin/<int:question_id>/', views.process_question_by_admin, name='process_question_by_admin'),
     path('question/admin/pending/', views.view_pending_questions_by_admin, name='view_pending_questions_by_admin'),
     path('question/admin/locked/', views.view_locked_questions_by_admin, name='view_locked_questions_by_admin'),
@@ -41,5 +46,9 @@ urlpatterns = [
     path('question/answered/', views.view_answered_questions, name='view_answered_questions'),
     path('question/unanswered', views.view_unanswered_questions, name='view_unanswered_questions'),
 
+    path('api/question/', views.api_view_questions, name='api_view_questions'),
+
     path('', views.view_root, name='view_root'),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
+# only the preview files are served as they are, the files of questions go through view_question_media (visibility)
+urlpatterns += static(settings.TMP_MEDIA_URL, document_root=settings.TMP_MEDIA_ROOT)
@@ -1,6 +1,9 @@
 import datetime
+import functools
+import hashlib
 import json
 import math
+import operator
 import os
 import pathlib
 import re
@@ -8,19 +11,22 @@ import re
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.sessions.models import Session
-from django.core.files import File
-from django.db.models import Q, Count
-from django.http import HttpResponseBadRequest as _HttpResponseBadRequest, HttpResponseNotFound, HttpResponseNotAllowed
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q, OuterRef, Subquery
+from django.http import HttpResponseBadRequest as _HttpResponseBadRequest, HttpResponseNotFound, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
 from django.utils.translation import gettext_lazy as _
-from django.views.decorators.http import require_http_methods
-from sympy import preview as sympy_preview
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_http_methods
 from users.views import ensure_is_not_anonymous_user, ensure_is_admin, set_prev_adj_url
 
-from .models import QuestionTag, Question, Answer, Comment, QuestionMedia, Log, QuestionEvaluation, CommentEvaluation
+from . import count_cache, latex, media, question_cards, uploads
+from .models import QuestionTag, Question, Hashtag, Answer, UserQuestionProgress, Comment, QuestionMedia, Log, QuestionEvaluation, QuestionSnapshot, CommentEvaluation
+from .search import get_question_content_filter, get_question_search_rank
 
 
 class HttpResponseBadRequest(_HttpResponseBadRequest):
@@ -37,7 +43,7 @@ def convert_to_non_negative_int(string: str, default: int = 0):
     return int(string) if re.match(string=string, pattern=re.compile('^[0-9]+$')) else default
 
 
-def get_limit_offset_count(session, limit_in_params: str, limit_key_name: str, offset_in_params: str, records_count: int):
+def get_limit(session, limit_in_params: str, limit_key_name: str):
     if limit_key_name:
         limit = convert_to_non_negative_int(string=limit_in_params, default=0)
         if not limit:
@@ -46,6 +52,11 @@ def get_limit_offset_count(session, limit_in_params: str, limit_key_name: str, o
             session[limit_key_name] = limit
     else:
         limit = convert_to_non_negative_int(string=limit_in_params, default=4)
+    return limit
+
+
+def get_limit_offset_count(session, limit_in_params: str, limit_key_name: str, offset_in_params: str, records_count: int):
+    limit = get_limit(session=session, limit_in_params=limit_in_params, limit_key_name=limit_key_name)
 
     page_count = math.ceil(records_count / limit) or 1
 
@@ -58,6 +69,228 @@ def get_limit_offset_count(session, limit_in_params: str, limit_key_name: str, o
     return limit, page_offset, page_count, (page_offset - 1) * limit
 
 
+def encode_cursor(order_bys: list, record, direction: str):
+    values = []
+    for order_by in order_bys:
+        value = getattr(record, order_by.lstrip('-'))
+        values.append(value.isoformat() if isinstance(value, datetime.datetime) else value)
+    cursor = {'order_bys': order_bys, 'values': values, 'direction': direction}
+    return urlsafe_base64_encode(json.dumps(cursor, ensure_ascii=False).encode('utf-8'))
+
+
+def get_order_field(queryset, name: str):
+    # a field of the model or an annotation of the queryset (e.g. search_rank)
+    annotation = queryset.query.annotations.get(name)
+    return annotation.output_field if annotation is not None else queryset.model._meta.get_field(name)
+
+
+def decode_cursor(cursor: str, order_bys: list, queryset):
+    """
+    Returns (values, direction) of the cursor, or None when the cursor is invalid
+    or was made for another order (e.g. the sorters have been changed since).
+    """
+    try:
+        cursor = json.loads(urlsafe_base64_decode(cursor).decode('utf-8'))
+        if (not isinstance(cursor, dict) or cursor.get('order_bys') != order_bys
+                or cursor.get('direction') not in ('next', 'prev')
+                or not isinstance(cursor.get('values'), list) or len(cursor['values']) != len(order_bys)):
+            return None
+        values = []
+        for order_by, value in zip(order_bys, cursor['values']):
+            # a crafted cursor must not reach the query: each value is converted by its field
+            if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+                return None
+            values.append(get_order_field(queryset, order_by.lstrip('-')).to_python(value))
+        return values, cursor['direction']
+    except (UnicodeDecodeError, ValueError, TypeError, ValidationError):
+        return None
+
+
+def get_keyset_filter(order_bys: list, values: list, backward: bool = False):
+    # (a, b, c) after (x, y, z) <=> a > x or (a = x and b > y) or (a = x and b = y and c > z)
+    conditions = []
+    equal_condition = Q()
+    for order_by, value in zip(order_bys, values):
+        field_name = order_by.lstrip('-')
+        descending = order_by.startswith('-') != backward
+        conditions.append(equal_condition & Q(**{f"{field_name}__{'lt' if descending else 'gt'}": value}))
+        equal_condition &= Q(**{field_name: value})
+    return functools.reduce(operator.or_, conditions)
+
+
+def get_keyset_page(queryset, order_bys: list, cursor_in_params: str, limit: int):
+    """
+    Keyset (cursor) pagination: seeks to the page with an indexed condition instead of OFFSET
+    and never counts the records.
+    order_bys must end with a unique field (e.g. 'id') so that every record has a unique position.
+    Returns (records, prev_cursor, next_cursor), a cursor is '' if there is no page in that direction.
+    """
+    decoded_cursor = decode_cursor(cursor_in_params, order_bys, queryset) if cursor_in_params else None
+    backward = False
+    if decoded_cursor:
+        values, direction = decoded_cursor
+        backward = direction == 'prev'
+        queryset = queryset.filter(get_keyset_filter(order_bys, values, backward))
+
+    if backward:
+        queryset = queryset.order_by(*[order_by[1:] if order_by.startswith('-') else f'-{order_by}' for order_by in order_bys])
+    else:
+        queryset = queryset.order_by(*order_bys)
+
+    records = list(queryset[:limit + 1])
+    has_more = len(records) > limit
+    records = records[:limit]
+    if backward:
+        records.reverse()
+        has_prev, has_next = has_more, True
+    else:
+        has_prev, has_next = decoded_cursor is not None, has_more
+
+    prev_cursor = encode_cursor(order_bys, records[0], 'prev') if records and has_prev else ''
+    next_cursor = encode_cursor(order_bys, records[-1], 'next') if records and has_next else ''
+    return records, prev_cursor, next_cursor
+
+
+def get_list_page(session, params, queryset, order_bys: list, limit_key_name: str, get_records_count):
+    """
+    With a 'cursor' parameter: keyset mode, previous/next page only and no count.
+    Otherwise: offset mode, numbered page links from get_records_count() and cursors for the previous/next page.
+    Returns (records, limit, page_offset, page_count, prev_cursor, next_cursor), page_count is 0 in keyset mode.
+    """
+    cursor = params.get('cursor', '')
+    if cursor:
+        limit = get_limit(session=session, limit_in_params=params.get('limit', ''), limit_key_name=limit_key_name)
+        records, prev_cursor, next_cursor = get_keyset_page(queryset=queryset, order_bys=order_bys, cursor_in_params=cursor, limit=limit)
+        return records, limit, 1, 0, prev_cursor, next_cursor
+
+    limit, page_offset, page_count, offset = get_limit_offset_count(
+        session=session,
+        limit_in_params=params.get('limit', ''),
+        limit_key_name=limit_key_name,
+        offset_in_params=params.get('offset', ''),
+        records_count=get_records_count(),
+    )
+    records = list(queryset.order_by(*order_bys)[offset:(offset + limit)])
+    prev_cursor = encode_cursor(order_bys, records[0], 'prev') if records and page_offset > 1 else ''
+    next_cursor = encode_cursor(order_bys, records[-1], 'next') if records and page_offset < page_count else ''
+    return records, limit, page_offset, page_count, prev_cursor, next_cursor
+
+
+def load_question_cards(queryset):
+    # everything serialize_question touches (author, tag, hashtags, media) is loaded
+    # in a constant number of queries whatever the page size
+    return queryset.select_related('user', 'tag').prefetch_related('hashtag_set', 'questionmedia_set')
+
+
+def get_question_content_keywords(filters_and_sorters: dict):
+    contents = filters_and_sorters.get('filter_by_content', '')
+    return [content.strip() for content in contents.split(',') if content.strip()] if contents else []
+
+
+def get_question_search_rank_of(filters_and_sorters: dict):
+    """
+    Returns the bm25 rank expression ordering a listing filtered by content (the most relevant first),
+    or None if there is no content filter or the questions are sorted from the oldest.
+    """
+    if filters_and_sorters.get('sorter_with_created_at', '') == '+':
+        return None
+    contents = get_question_content_keywords(filters_and_sorters)
+    return get_question_search_rank(contents) if contents else None
+
+
+def annotate_question_search_rank(queryset, filters_and_sorters: dict):
+    # search_rank is ordered by get_question_order_bys
+    search_rank = get_question_search_rank_of(filters_and_sorters)
+    return queryset.annotate(search_rank=search_rank) if search_rank is not None else queryset
+
+
+def get_question_filters(filters_and_sorters: dict):
+    """
+    filters_and_sorters: values of the filter form of questions.html
+    (kept in the session by view_questions, query parameters of api_view_questions)
+    Raises ValueError if a created_at filter is not a 'YYYY-MM-DDTHH:MM' string.
+    """
+    filters = []
+
+    created_at_from = filters_and_sorters.get('filter_by_created_at_from', '')
+    if created_at_from:
+        created_at_from = datetime.datetime.strptime(created_at_from + ':00.000000', '%Y-%m-%dT%H:%M:%S.%f').replace(tzinfo=timezone.get_current_timezone())
+        filters.append(Q(created_at__gte=created_at_from))
+
+    created_at_to = filters_and_sorters.get('filter_by_created_at_to', '')
+    if created_at_to:
+        created_at_to = datetime.datetime.strptime(created_at_to + ':59.999999', '%Y-%m-%dT%H:%M:%S.%f').replace(tzinfo=timezone.get_current_timezone())
+        filters.append(Q(created_at__lte=created_at_to))
+
+    contents = get_question_content_keywords(filters_and_sorters)
+    if contents:
+        content_filter = get_question_content_filter(contents)
+        if content_filter:
+            filters.append(content_filter)
+
+    hashtags = filters_and_sorters.get('filter_by_hashtag', '')
+    if hashtags:
+        hashtags = [hashtag.strip() for hashtag in hashtags.split(',') if hashtag.strip()]
+        hashtag_filter = Hashtag.get_questions_filter(hashtags)
+        if hashtag_filter:
+            filters.append(hashtag_filter)
+
+    author_codes = filters_and_sorters.get('filter_by_author_code', '')
+    if author_codes:
+        author_codes = [author_code.strip() for author_code in author_codes.split(',') if author_code.strip()]
+        user_ids = get_user_model().get_ids_by_codes(author_codes)
+        if user_ids is not None:
+            filters.append(Q(user_id__in=user_ids))
+
+    return filters
+
+
+def get_question_order_bys(filters_and_sorters: dict):
+    # ends with 'id' so that keyset pagination has a unique position for every question
+    order_bys = []
+
+    if filters_and_sorters.get('sorter_with_decreasing_number_of_comments'):
+        order_bys.append('-comment_count')
+
+    if filters_and_sorters.get('sorter_with_decreasing_number_of_answers'):
+        order_bys.append('-answer_count')
+
+    # a content search lists the most relevant questions first, then the newest (annotate_question_search_rank)
+    if get_question_search_rank_of(filters_and_sorters) is not None:
+        order_bys.append('search_rank')
+
+    if filters_and_sorters.get('sorter_with_created_at', '') == '+':
+        order_bys.extend(['created_at', 'id'])
+    else:
+        order_bys.extend(['-created_at', '-id'])
+
+    return order_bys
+
+
+# number of the latest answers of the user shown on the detail page of a question
+recent_answer_count = 5
+# state of the questions of each admin list
+admin_question_list_states = {
+    'pending': 'Pending',
+    'locked': 'Locked',
+    'unapproved': 'Unapproved',
+    'approved': 'Approved',
+}
+
+
+def get_question_list_filters(user, list_name: str):
+    """
+    list_name: 'created', 'answered', 'unanswered' or a key of admin_question_list_states
+    """
+    if list_name == 'created':
+        return [Q(user_id=user.id)]
+    elif list_name == 'answered':
+        return [Q(id__in=UserQuestionProgress.get_question_ids(user.id)), Q(state='Approved')]
+    elif list_name == 'unanswered':
+        return [~Q(id__in=UserQuestionProgress.get_question_ids(user.id)), Q(state='Approved')]
+    return [Q(state=admin_question_list_states[list_name])]
+
+
 # Create your views here.
 notification_to_process_profile_key_name = 'practice.views.process_profile___notification'
 notification_to_view_detail_question_key_name = 'practice.views.view_detail_question__notification'
@@ -105,67 +338,40 @@ def view_questions(request, path_name=None, filters=None):
         }
 
     _filters_and_sorters = request.session[filters_and_sorters_key_name]
+    filters.extend(get_question_filters(_filters_and_sorters))
+    order_bys = get_question_order_bys(_filters_and_sorters)
 
-    created_at_from = _filters_and_sorters.get('filter_by_created_at_from', '')
-    if created_at_from:
-        created_at_from = datetime.datetime.strptime(created_at_from + ':00.000000', '%Y-%m-%dT%H:%M:%S.%f').replace(tzinfo=timezone.get_current_timezone())
-        filters.append(Q(created_at__gte=created_at_from))
-
-    created_at_to = _filters_and_sorters.get('filter_by_created_at_to', '')
-    if created_at_to:
-        created_at_to = datetime.datetime.strptime(created_at_to + ':59.999999', '%Y-%m-%dT%H:%M:%S.%f').replace(tzinfo=timezone.get_current_timezone())
-        filters.append(Q(created_at__lte=created_at_to))
-
-    contents = _filters_and_sorters.get('filter_by_content', '')
-    if contents:
-        contents = [content.strip() for content in contents.split(',') if content.strip()]
-        if contents:
-            filters.append(Q(content__iregex=r"^.*" + ('|'.join(contents)) + r".*$"))
-
-    hashtags = _filters_and_sorters.get('filter_by_hashtag', '')
-    if hashtags:
-        hashtags = [hashtag.strip() for hashtag in hashtags.split(',') if hashtag.strip()]
-        if hashtags:
-            filters.append(Q(hashtags__iregex=r"^.*" + ('|'.join(hashtags)) + r".*$"))
-
-    author_codes = _filters_and_sorters.get('filter_by_author_code', '')
-    if author_codes:
-        author_codes = [author_code.strip() for author_code in author_codes.split(',') if author_code.strip()]
-        if author_codes:
-            filters.append(Q(user__code__iregex=r"^.*" + ('|'.join(author_codes)) + r".*$"))
-
-    limit, page_offset, page_count, offset = get_limit_offset_count(
+    cursor = params.get('cursor', '')
+    # the page only reads the columns it is ordered by, the cards are rendered from the snapshots of the questions
+    questions, limit, page_offset, page_count, prev_cursor, next_cursor = get_list_page(
         session=request.session,
-        limit_in_params=params.get('limit', ''),
+        params=params,
+        queryset=annotate_question_search_rank(Question.objects.filter(*filters).distinct().only('id', 'created_at', 'answer_count', 'comment_count'), _filters_and_sorters),
+        order_bys=order_bys,
         limit_key_name='practice.views.view_questions__limit',
-        offset_in_params=params.get('offset', ''),
-        records_count=Question.objects.filter(*filters).distinct().count(),
+        # authors are filtered by a subquery on the indexed codes of the users (User.get_ids_by_codes): a code never
+        # changes and the questions of a deleted user are deleted with it, so the counts do not depend on saved users
+        get_records_count=lambda: count_cache.get_count(Question.objects.filter(*filters).distinct(), depends_on=(Question, UserQuestionProgress, Hashtag)),
     )
+    include_limit_exclude_offset_url = f"{reverse(path_name)}?tid={tag_id}&limit={limit}"
 
-    order_bys = []
-    k_alias = {}
-
-    if _filters_and_sorters.get('sorter_with_decreasing_number_of_comments'):
-        k_alias['comment__count'] = Count('comment')
-        order_bys.append('-comment__count')
-
-    if _filters_and_sorters.get('sorter_with_decreasing_number_of_answers'):
-        k_alias['answer__count'] = Count('answer')
-        order_bys.append('-answer__count')
-
-    order_bys.append('created_at' if _filters_and_sorters.get('sorter_with_created_at', '') == '+' else '-created_at')
-
-    questions = Question.objects.filter(*filters).alias(**k_alias).order_by(*order_bys).distinct()[offset:(offset + limit)]
+    snapshots = QuestionSnapshot.get_many([question.id for question in questions])
+    questions = [snapshots[question.id] for question in questions if question.id in snapshots]
+    cards, card_hits, card_misses = question_cards.render_question_cards(questions)
 
     context = {
         "suffix_utc": '' if not timezone.get_current_timezone_name() == 'UTC' else 'UTC',
         "tags": tags,
         "questions": questions,
+        "question_cards": cards,
         "path_name": path_name,
-        "include_limit_exclude_offset_url": f"{reverse(path_name)}?tid={tag_id}&limit={limit}",
+        "include_limit_exclude_offset_url": include_limit_exclude_offset_url,
         "question_conditions": {
+            "cursor_mode": bool(cursor),
+            "prev_cursor_url": f"{include_limit_exclude_offset_url}&cursor={prev_cursor}" if prev_cursor else '',
+            "next_cursor_url": f"{include_limit_exclude_offset_url}&cursor={next_cursor}" if next_cursor else '',
             "page_range": range(1, page_count + 1),
-            "limits": [4, 8, 16],
+            "limits": [4, 8, 16, 50],
             "tag_id": tag_id,
             "tag_name": tag_name,
             "limit": limit,
@@ -181,25 +387,27 @@ def view_questions(request, path_name=None, filters=None):
         },
     }
 
-    return render(request, template_name='practice/questions.html', context=context)
+    response = render(request, template_name='practice/questions.html', context=context)
+    response['X-Question-Card-Cache'] = f'hits={card_hits}; misses={card_misses}'
+    return response
 
 
 @ensure_is_not_anonymous_user
 @require_http_methods(['GET'])
 def view_created_questions(request):
-    return view_questions(request, path_name='practice:view_created_questions', filters=[Q(user_id=request.user.id)])
+    return view_questions(request, path_name='practice:view_created_questions', filters=get_question_list_filters(request.user, 'created'))
 
 
 @ensure_is_not_anonymous_user
 @require_http_methods(['GET'])
 def view_answered_questions(request):
-    return view_questions(request, path_name='practice:view_answered_questions', filters=[Q(answer__user_id=request.user.id), Q(state='Approved')])
+    return view_questions(request, path_name='practice:view_answered_questions', filters=get_question_list_filters(request.user, 'answered'))
 
 
 @ensure_is_not_anonymous_user
 @require_http_methods(['GET'])
 def view_unanswered_questions(request):
-    return view_questions(request, path_name='practice:view_unanswered_questions', filters=[~Q(answer__user_id=request.user.id), Q(state='Approved')])
+    return view_questions(request, path_name='practice:view_unanswered_questions', filters=get_question_list_filters(request.user, 'unanswered'))
 
 
 @ensure_is_not_anonymous_user
@@ -351,6 +559,93 @@ def process_profile(request, profile_id):
         return HttpResponseNotAllowed(['GET', 'POST'])
 
 
+# messages of the error codes of practice.latex
+latex_error_messages = {
+    latex.SYNTAX_ERROR: 'Nội dung latex không đúng cú pháp',
+    latex.TIMEOUT_ERROR: 'Nội dung latex quá phức tạp, vui lòng rút gọn và thử lại',
+    latex.BUSY_ERROR: 'Hệ thống đang bận, vui lòng thử lại sau',
+}
+
+
+def get_latex_error_message(code):
+    return latex_error_messages.get(code, 'Có lỗi xảy ra, vui lòng thay đổi nội dung latex và thử lại')
+
+
+@ensure_is_not_anonymous_user
+@require_http_methods(['GET'])
+@cache_control(no_store=True)
+def view_latex_job(request, job_id):
+    # polled by the preview of new_question.html while the render is pending
+    if not latex.is_job_id(job_id):
+        return HttpResponseNotFound(_('<h1>Not Found</h1>'))
+    status, value = latex.get_state(job_id)
+    if status is None:
+        return JsonResponse({'status': 'unknown'}, status=404)
+    if status == latex.DONE:
+        return JsonResponse({'status': status, 'url': settings.TMP_MEDIA_URL + value})
+    if status == latex.FAILED:
+        return JsonResponse({'status': status, 'error': get_latex_error_message(value)})
+    return JsonResponse({'status': status})
+
+
+upload_error_messages = {
+    uploads.NOT_FOUND_ERROR: 'Không tìm thấy tệp đang tải lên, vui lòng chọn lại tệp.',
+    uploads.TYPE_ERROR: 'Định dạng của tệp không hợp lệ.',
+    uploads.SIZE_ERROR: 'Kích thước của tệp vượt quá giới hạn.',
+    uploads.OFFSET_ERROR: 'Vị trí tải lên không khớp, hãy tiếp tục từ vị trí đã nhận.',
+    uploads.CHUNK_SIZE_ERROR: 'Kích thước của phần tệp không hợp lệ.',
+}
+upload_error_statuses = {
+    uploads.NOT_FOUND_ERROR: 404,
+    uploads.TYPE_ERROR: 415,
+    uploads.SIZE_ERROR: 413,
+    uploads.OFFSET_ERROR: 409,
+    uploads.CHUNK_SIZE_ERROR: 400,
+}
+
+
+def get_upload_error_response(error, offset=None):
+    return JsonResponse({'error': upload_error_messages[error], 'code': error, 'offset': offset}, status=upload_error_statuses[error])
+
+
+@ensure_is_not_anonymous_user
+@require_http_methods(['POST'])
+def process_new_question_media_upload(request):
+    # started by practice/js/media_upload.js when a file is chosen in new_question.html
+    params = request.POST
+    upload_id, error = uploads.create(request.session, request.user.code, params.get('kind'), params.get('name'),
+                                      convert_to_non_negative_int(params.get('size', '')))
+    if error != uploads.OK:
+        return get_upload_error_response(error)
+    return JsonResponse({'upload_id': upload_id, 'offset': 0,
+                         'url': reverse('practice:process_question_media_upload_chunk', args=[upload_id])}, status=201)
+
+
+@ensure_is_not_anonymous_user
+@require_http_methods(['GET', 'POST'])
+@cache_control(no_store=True)
+def process_question_media_upload_chunk(request, upload_id):
+    upload = uploads.get_upload(request.session, upload_id)
+    if upload is None:
+        return get_upload_error_response(uploads.NOT_FOUND_ERROR)
+
+    if request.method == 'POST':
+        # the body is read as a stream, it is never loaded in memory nor in request.FILES
+        offset = request.headers.get('Upload-Offset', '')
+        length = request.META.get('CONTENT_LENGTH', '')
+        if not offset.isdigit() or not length.isdigit():
+            return get_upload_error_response(uploads.CHUNK_SIZE_ERROR, uploads.get_offset(upload))
+        offset, error = uploads.append(upload, int(offset), request, int(length))
+        if error != uploads.OK:
+            return get_upload_error_response(error, offset)
+    else:
+        offset = uploads.get_offset(upload)
+        if offset is None:
+            return get_upload_error_response(uploads.NOT_FOUND_ERROR)
+
+    return JsonResponse({'upload_id': upload_id, 'offset': offset, 'size': upload['size'], 'completed': uploads.is_completed(upload)})
+
+
 @ensure_is_not_anonymous_user
 def process_new_question(request):
     if request.method == 'GET':
@@ -476,9 +771,17 @@ def process_new_question(request):
                 if addition_image_filename:
                     context['addition_image_url'] = settings.TMP_MEDIA_URL + addition_image_filename
 
-                latex_image_filename = data_in_params.get('latex_image_filename')
-                if latex_image_filename:
-                    context['latex_image_url'] = settings.TMP_MEDIA_URL + latex_image_filename
+                latex_job_id = data_in_params.get('latex_job_id')
+                if isinstance(latex_job_id, str) and latex.is_job_id(latex_job_id):
+                    # posted again with the form, the submit reads the render of this job
+                    context['latex_job_id'] = latex_job_id
+                    latex_status, latex_value = latex.get_state(latex_job_id)
+                    if latex_status == latex.DONE:
+                        context['latex_image_url'] = settings.TMP_MEDIA_URL + latex_value
+                    elif latex_status == latex.PENDING:
+                        context['latex_status_url'] = reverse('practice:view_latex_job', args=[latex_job_id])
+                    elif latex_status == latex.FAILED:
+                        data['latex_content']['errors'].append(get_latex_error_message(latex_value))
 
                 video_filename = data_in_params.get('video_filename')
                 if video_filename:
@@ -546,7 +849,20 @@ def process_new_question(request):
                 is_valid = False
                 data['audio']['errors'].append(f'Kích thước audio phải bé hơn {QuestionMedia.MAX_AUDIO_SIZE}MB')
 
-        params = request.POST
+        params = request.POST.copy()
+        # a completed chunked upload (practice.uploads) is handled as the file uploaded by a previous preview
+        for kind, url_param_name, using_param_name in (('image', 'old_addition_image_url', 'using_old_image'),
+                                                       ('video', 'old_video_url', 'using_old_video'),
+                                                       ('audio', 'old_audio_url', 'using_old_audio')):
+            upload_id = params.get(f'{kind}_upload_id')
+            if upload_id and not request.FILES.get(kind):
+                uploaded_filename = uploads.get_completed_filename(request.session, upload_id, kind)
+                if uploaded_filename:
+                    params[url_param_name] = settings.TMP_MEDIA_URL + uploaded_filename
+                    params[using_param_name] = 'on'
+                else:
+                    is_valid = False
+                    data[kind]['errors'].append('Tệp chưa được tải lên xong, vui lòng chọn lại tệp')
 
         choices = []
         choice_order = 1
@@ -608,160 +924,30 @@ def process_new_question(request):
         latex_content = data['latex_content']['value'].strip()
         latex_image_pathname = ''
         if latex_content:
-            latex_image_filename = f"{datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%d%H%M%S%f')}{request.user.code[1:]}latex.png"
-            latex_image_pathname = pathlib.Path(settings.TMP_MEDIA_ROOT, latex_image_filename)
-            with open(latex_image_pathname, 'wb+'):
-                pass
             try:
-                extra_preamble = ("\\usepackage[utf8]{inputenc}\n"
-                                  "\\DeclareUnicodeCharacter{1EA0}{\\text{A}}"
-                                  "\\DeclareUnicodeCharacter{1EA1}{\\text{a}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EA2}{\\text{A}}"
-                                  "\\DeclareUnicodeCharacter{1EA3}{\\text{a}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EA4}{\\text{A}}"
-                                  "\\DeclareUnicodeCharacter{1EA5}{\\text{a}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EAE}{\\text{A}}"
-                                  "\\DeclareUnicodeCharacter{1EAF}{\\text{a}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EB0}{\\text{A}}"
-                                  "\\DeclareUnicodeCharacter{1EB1}{\\text{a}}" #ằ
-                                  
-                                  "\\DeclareUnicodeCharacter{1EB2}{\\text{A}}"
-                                  "\\DeclareUnicodeCharacter{1EB3}{\\text{a}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EB4}{\\text{A}}"
-                                  "\\DeclareUnicodeCharacter{1EB5}{\\text{a}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EB6}{\\text{A}}"
-                                  "\\DeclareUnicodeCharacter{1EB7}{\\text{a}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EA6}{\\text{A}}"
-                                  "\\DeclareUnicodeCharacter{1EA7}{\\text{a}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EA8}{\\text{A}}"
-                                  "\\DeclareUnicodeCharacter{1EA9}{\\text{a}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EAA}{\\text{A}}"
-                                  "\\DeclareUnicodeCharacter{1EAB}{\\text{a}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EAC}{\\text{A}}"
-                                  "\\DeclareUnicodeCharacter{1EAD}{\\text{a}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{0110}{\\text{D}}"
-                                  "\\DeclareUnicodeCharacter{0111}{\\text{d}}" #đ
-                                  
-                                  "\\DeclareUnicodeCharacter{1EBA}{\\text{e}}"
-                                  "\\DeclareUnicodeCharacter{1EBB}{\\text{e}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EBC}{\\text{e}}"
-                                  "\\DeclareUnicodeCharacter{1EBD}{\\text{e}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EBE}{\\text{e}}"
-                                  "\\DeclareUnicodeCharacter{1EBF}{\\text{e}}" #ế
-                                  
-                                  "\\DeclareUnicodeCharacter{1EB8}{\\text{e}}"
-                                  "\\DeclareUnicodeCharacter{1EB9}{\\text{e}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EC0}{\\text{e}}"
-                                  "\\DeclareUnicodeCharacter{1EC1}{\\text{e}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EC2}{\\text{e}}"
-                                  "\\DeclareUnicodeCharacter{1EC3}{\\text{e}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EC4}{\\text{e}}"
-                                  "\\DeclareUnicodeCharacter{1EC5}{\\text{e}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EC6}{\\text{e}}"
-                                  "\\DeclareUnicodeCharacter{1EC7}{\\text{e}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EC8}{\\text{I}}"                      
-                                  "\\DeclareUnicodeCharacter{1EC9}{\\text{i}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1ECA}{\\text{I}}"
-                                  "\\DeclareUnicodeCharacter{1ECB}{\\text{i}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1ECC}{\\text{O}}"
-                                  "\\DeclareUnicodeCharacter{1ECD}{\\text{o}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1ECE}{\\text{O}}"
-                                  "\\DeclareUnicodeCharacter{1ECF}{\\text{o}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1ED0}{\\text{O}}"
-                                  "\\DeclareUnicodeCharacter{1ED1}{\\text{o}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1ED2}{\\text{O}}"
-                                  "\\DeclareUnicodeCharacter{1ED3}{\\text{o}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1ED4}{\\text{O}}"
-                                  "\\DeclareUnicodeCharacter{1ED5}{\\text{o}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1ED6}{\\text{O}}"
-                                  "\\DeclareUnicodeCharacter{1ED7}{\\text{o}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1ED8}{\\text{O}}"
-                                  "\\DeclareUnicodeCharacter{1ED9}{\\text{o}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EDA}{\\text{O}}"
-                                  "\\DeclareUnicodeCharacter{1EDB}{\\text{o}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EDC}{\\text{O}}"
-                                  "\\DeclareUnicodeCharacter{1EDD}{\\text{o}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EDE}{\\text{O}}"
-                                  "\\DeclareUnicodeCharacter{1EDF}{\\text{o}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EE0}{\\text{O}}"
-                                  "\\DeclareUnicodeCharacter{1EE1}{\\text{o}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EE2}{\\text{O}}"
-                                  "\\DeclareUnicodeCharacter{1EE3}{\\text{o}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{01A0}{\\text{O}}"
-                                  "\\DeclareUnicodeCharacter{01A1}{\\text{o}}" #ơ
-                                  
-                                  "\\DeclareUnicodeCharacter{1EE4}{\\text{U}}"
-                                  "\\DeclareUnicodeCharacter{1EE5}{\\text{u}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EE6}{\\text{U}}"
-                                  "\\DeclareUnicodeCharacter{1EE7}{\\text{u}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{01AF}{\\text{U}}"
-                                  "\\DeclareUnicodeCharacter{01B0}{\\text{u}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EE8}{\\text{U}}"
-                                  "\\DeclareUnicodeCharacter{1EE9}{\\text{u}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EEA}{\\text{U}}"
-                                  "\\DeclareUnicodeCharacter{1EEB}{\\text{u}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EEC}{\\text{U}}"
-                                  "\\DeclareUnicodeCharacter{1EED}{\\text{u}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EEE}{\\text{U}}"
-                                  "\\DeclareUnicodeCharacter{1EEF}{\\text{u}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EF0}{\\text{U}}"
-                                  "\\DeclareUnicodeCharacter{1EF1}{\\text{u}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EF4}{\\text{Y}}"
-                                  "\\DeclareUnicodeCharacter{1EF5}{\\text{y}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EF6}{\\text{Y}}"
-                                  "\\DeclareUnicodeCharacter{1EF7}{\\text{y}}"
-                                  
-                                  "\\DeclareUnicodeCharacter{1EF8}{\\text{Y}}"
-                                  "\\DeclareUnicodeCharacter{1EF9}{\\text{y}}"
-                                  )
-                sympy_preview(latex_content, viewer='file', extra_preamble=extra_preamble, filename=latex_image_pathname, euler=False)
-                data['latex_image_filename'] = latex_image_filename
-            except Exception as e:
-                if str(e).startswith("'latex' exited abnormally with the following output:"):
-                    data['latex_content']['errors'].append('Nội dung latex không đúng cú pháp')
+                if params.get('preview'):
+                    # the render runs outside of the request, the preview page polls its job
+                    data['latex_job_id'] = latex.submit(latex_content)
                 else:
-                    data['latex_content']['errors'].append('Có lỗi xảy ra, vui lòng thay đổi nội dung latex và thử lại')
+                    # the render of the preview (posted latex_job_id) is read, never waited for in the request;
+                    # a job id which is not the key of the content (content changed, no preview) submits the content
+                    latex_job_id = params.get('latex_job_id', '')
+                    if not latex.is_job_id(latex_job_id) or latex_job_id != latex.get_key(latex_content):
+                        latex_job_id = latex.submit(latex_content)
+                    latex_status, latex_value = latex.get_state(latex_job_id)
+                    if latex_status == latex.DONE:
+                        latex_image_pathname = pathlib.Path(settings.TMP_MEDIA_ROOT, latex_value)
+                    elif latex_status == latex.FAILED:
+                        raise latex.RenderError(latex_value)
+                    else:
+                        # pending (or evicted, submitted again): the form is shown again and polls the job
+                        is_valid = False
+                        data['latex_job_id'] = latex_job_id
+                        data['latex_content']['errors'].append('Ảnh latex đang được tạo, vui lòng bấm "Tạo" lại sau khi ảnh hiển thị')
+            except latex.RenderError as e:
+                if not params.get('preview'):
+                    is_valid = False
+                data['latex_content']['errors'].append(get_latex_error_message(e.code))
 
         if not image and params.get('using_old_image') and params.get('old_addition_image_url'):
             old_addition_image_url = params.get('old_addition_image_url')
@@ -859,25 +1045,19 @@ def process_new_question(request):
             if image and not data['image']['errors']:
                 addition_image_filename = f"{datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%d%H%M%S%f')}{request.user.code[1:]}addition_{image.name}"
                 addition_image_pathname = pathlib.Path(settings.TMP_MEDIA_ROOT, addition_image_filename)
-                with open(addition_image_pathname, 'wb+') as f:
-                    for chunk in image.chunks():
-                        f.write(chunk)
+                media.save_preview_file(addition_image_pathname, image)
                 data['addition_image_filename'] = addition_image_filename
 
             if video and not data['video']['errors']:
                 video_filename = f"{datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%d%H%M%S%f')}{request.user.code[1:]}{video.name}"
                 video_pathname = pathlib.Path(settings.TMP_MEDIA_ROOT, video_filename)
-                with open(video_pathname, 'wb+') as f:
-                    for chunk in video.chunks():
-                        f.write(chunk)
+                media.save_preview_file(video_pathname, video)
                 data['video_filename'] = video_filename
 
             if audio and not data['audio']['errors']:
                 audio_filename = f"{datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%d%H%M%S%f')}{request.user.code[1:]}{audio.name}"
                 audio_pathname = pathlib.Path(settings.TMP_MEDIA_ROOT, audio_filename)
-                with open(audio_pathname, 'wb+') as f:
-                    for chunk in audio.chunks():
-                        f.write(chunk)
+                media.save_preview_file(audio_pathname, audio)
                 data['audio_filename'] = audio_filename
 
         elif is_valid:
@@ -889,84 +1069,82 @@ def process_new_question(request):
 
             create_at = datetime.datetime.now(datetime.timezone.utc)
 
-            q = Question(content=content,
-                         state='Pending',
-                         choices=choices,
-                         tag_id=tag_id,
-                         user_id=request.user.id,
-                         hashtags=','.join(hashtags),
-                         created_at=create_at)
-            q.save()
-
-            if latex_image_pathname:
-                qm = QuestionMedia(name='question_latex_image',
-                                   media_type='image',
-                                   question_id=q.id,
-                                   created_at=create_at)
-                with open(latex_image_pathname, 'rb') as f:
-                    data = File(f)
-                    qm.file.save('latex.png', data)
-                qm.save()
-
-            if image:
-                qm = QuestionMedia(name='question_addition_image',
-                                   media_type='image',
-                                   question_id=q.id,
-                                   file=image,
-                                   created_at=create_at)
-                qm.save()
-            elif params.get('using_old_image') and params.get('old_addition_image_url'):
-                addition_image_filename = params.get('old_addition_image_url', '')[len(settings.TMP_MEDIA_URL):]
-                addition_image_pathname = pathlib.Path(settings.TMP_MEDIA_ROOT, addition_image_filename)
-                if os.path.exists(addition_image_pathname):
-                    qm = QuestionMedia(name='question_addition_image',
+            # the preview files promoted into the storage are removed once the question and its media are committed
+            # (QuestionMedia.promote_file), a failed submit keeps them for the next one
+            with transaction.atomic():
+                q = Question(content=content,
+                             state='Pending',
+                             choices=choices,
+                             tag_id=tag_id,
+                             user_id=request.user.id,
+                             hashtags=','.join(hashtags),
+                             created_at=create_at)
+                q.save()
+                q.set_hashtags(hashtags)
+
+                if latex_image_pathname:
+                    qm = QuestionMedia(name='question_latex_image',
                                        media_type='image',
                                        question_id=q.id,
                                        created_at=create_at)
-                    with open(addition_image_pathname, 'rb') as f:
-                        data = File(f)
-                        qm.file.save(addition_image_filename[(20 + len(f'{request.user.code[1:]}addition_')):], data)
+                    qm.promote_file(latex_image_pathname, 'latex.png', removing_source=False)
                     qm.save()
 
-            if video:
-                qm = QuestionMedia(name='question_video',
-                                   media_type='video',
-                                   question_id=q.id,
-                                   file=video,
-                                   created_at=create_at)
-                qm.save()
-            elif params.get('using_old_video') and params.get('old_video_url'):
-                video_filename = params.get('old_video_url', '')[len(settings.TMP_MEDIA_URL):]
-                video_pathname = pathlib.Path(settings.TMP_MEDIA_ROOT, video_filename)
-                if os.path.exists(video_pathname):
+                if image:
+                    qm = QuestionMedia(name='question_addition_image',
+                                       media_type='image',
+                                       question_id=q.id,
+                                       file=image,
+                                       created_at=create_at)
+                    qm.save()
+                elif params.get('using_old_image') and params.get('old_addition_image_url'):
+                    addition_image_filename = params.get('old_addition_image_url', '')[len(settings.TMP_MEDIA_URL):]
+                    addition_image_pathname = pathlib.Path(settings.TMP_MEDIA_ROOT, addition_image_filename)
+                    if os.path.exists(addition_image_pathname):
+                        qm = QuestionMedia(name='question_addition_image',
+                                           media_type='image',
+                                           question_id=q.id,
+                                           created_at=create_at)
+                        qm.promote_file(addition_image_pathname, addition_image_filename[(20 + len(f'{request.user.code[1:]}addition_')):])
+                        qm.save()
+
+                if video:
                     qm = QuestionMedia(name='question_video',
                                        media_type='video',
                                        question_id=q.id,
+                                       file=video,
                                        created_at=create_at)
-                    with open(video_pathname, 'rb') as f:
-                        data = File(f)
-                        qm.file.save(video_filename[(20 + len(f'{request.user.code[1:]}')):], data)
                     qm.save()
-
-            if audio:
-                qm = QuestionMedia(name='question_audio',
-                                   media_type='audio',
-                                   question_id=q.id,
-                                   file=audio,
-                                   created_at=create_at)
-                qm.save()
-            elif params.get('using_old_audio') and params.get('old_audio_url'):
-                audio_filename = params.get('old_audio_url', '')[len(settings.TMP_MEDIA_URL):]
-                audio_pathname = pathlib.Path(settings.TMP_MEDIA_ROOT, audio_filename)
-                if os.path.exists(audio_pathname):
+                elif params.get('using_old_video') and params.get('old_video_url'):
+                    video_filename = params.get('old_video_url', '')[len(settings.TMP_MEDIA_URL):]
+                    video_pathname = pathlib.Path(settings.TMP_MEDIA_ROOT, video_filename)
+                    if os.path.exists(video_pathname):
+                        qm = QuestionMedia(name='question_video',
+                                           media_type='video',
+                                           question_id=q.id,
+                                           created_at=create_at)
+                        qm.promote_file(video_pathname, video_filename[(20 + len(f'{request.user.code[1:]}')):])
+                        qm.save()
+
+                if audio:
                     qm = QuestionMedia(name='question_audio',
                                        media_type='audio',
                                        question_id=q.id,
+                                       file=audio,
                                        created_at=create_at)
-                    with open(audio_pathname, 'rb') as f:
-                        data = File(f)
-                        qm.file.save(audio_filename[(20 + len(f'{request.user.code[1:]}')):], data)
                     qm.save()
+                elif params.get('using_old_audio') and params.get('old_audio_url'):
+                    audio_filename = params.get('old_audio_url', '')[len(settings.TMP_MEDIA_URL):]
+                    audio_pathname = pathlib.Path(settings.TMP_MEDIA_ROOT, audio_filename)
+                    if os.path.exists(audio_pathname):
+                        qm = QuestionMedia(name='question_audio',
+                                           media_type='audio',
+                                           question_id=q.id,
+                                           created_at=create_at)
+                        qm.promote_file(audio_pathname, audio_filename[(20 + len(f'{request.user.code[1:]}')):])
+                        qm.save()
+
+                QuestionSnapshot.rebuild([q.id])
 
             request.session[notification_to_view_detail_question_key_name] = "Thực hiện tạo câu hỏi thành công"
             return redirect(to='practice:view_detail_question', question_id=q.id)
@@ -1114,7 +1292,50 @@ def process_new_answer(request, question_id):
         return HttpResponseNotAllowed(['GET', 'POST'])
 
 
-def view_question(request, question_id, showing_comments: bool = False):
+def get_question_page_etag(request, question_id, showing_comments: bool = False):
+    """
+    ETag of the page of view_question, from what the page shows: the question (state, counters, version, rating),
+    its latest comment, the answers of the viewer, the viewer, its back link (previous_adjacent_url), the timezone cookie
+    and the csrf cookie (token of the forms).
+    Returns None (the page is rendered) for other methods than GET and when a notification is waiting to be shown.
+    """
+    if request.method not in ('GET', 'HEAD') or request.session.get(notification_to_view_detail_question_key_name):
+        return None
+
+    # read from the question itself: a stale snapshot (see QuestionSnapshot.get_many) must not be validated
+    question = Question.objects.filter(id=question_id).values(
+        'state', 'user_id', 'answer_count', 'comment_count', 'version', 'questionratingsummary__rating_sum', 'questionratingsummary__rating_count',
+    ).annotate(
+        last_comment_at=Subquery(Comment.objects.filter(question_id=OuterRef('id')).order_by('-updated_at').values('updated_at')[:1]),
+        viewer_attempts=Subquery(UserQuestionProgress.objects.filter(question_id=OuterRef('id'), user_id=request.user.id).values('attempts')[:1]),
+        viewer_last_answered_at=Subquery(UserQuestionProgress.objects.filter(question_id=OuterRef('id'), user_id=request.user.id).values('last_answered_at')[:1]),
+    ).first()
+    if not question:
+        return None
+
+    validator = {
+        'question': question,
+        # the back link of the page, stored in the session from the Referer here as well since a 304 skips the view
+        'previous_adjacent_url': set_prev_adj_url(request),
+        'showing_comments': showing_comments,
+        'params': request.GET.urlencode(),
+        'comment_limit': request.session.get('practice.views.get_comments_in_question__limit') if showing_comments else None,
+        'viewer': [request.user.id, request.user.role, request.user.name, request.user.code],
+        'tsum': request.COOKIES.get('tsum', ''),
+        'csrf': request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+    }
+    return hashlib.sha256(json.dumps(validator, default=str, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def get_detail_question_etag(request, question_id):
+    return get_question_page_etag(request, question_id)
+
+
+def get_comments_in_question_etag(request, question_id):
+    return get_question_page_etag(request, question_id, showing_comments=True)
+
+
+def view_question(request, question_id, showing_comments: bool = False, showing_answer_history: bool = False):
     params = request.GET
 
     http_code = params.get('http_code')
@@ -1129,19 +1350,45 @@ def view_question(request, question_id, showing_comments: bool = False):
         notification = _(notification)
         request.session[notification_to_view_detail_question_key_name] = ''
 
+    # the page is served from the snapshot of the question, checked against the question (visibility uses its state)
+    question = QuestionSnapshot.get_many([question_id], checking_versions=True).get(question_id)
+    if not question:
+        return HttpResponseNotFound(_('<h1>Not Found</h1>'))
     if request.user.role != 'Admin':
         if not showing_comments:
-            question = Question.objects.filter(Q(id=question_id), (Q(state='Approved') | Q(user_id=request.user.id)))
+            is_visible = question.state == 'Approved' or question.user_id == request.user.id
         else:
-            question = Question.objects.filter(id=question_id, state='Approved')
-    else:
-        question = Question.objects.filter(id=question_id)
-
-    if not question:
-        return HttpResponseNotFound(_('<h1>Not Found</h1>'))
-    question = question[0]
+            is_visible = question.state == 'Approved'
+        if not is_visible:
+            return HttpResponseNotFound(_('<h1>Not Found</h1>'))
 
-    past_answers = Answer.objects.filter(user_id=request.user.id, question_id=question_id)
+    answer_progress = UserQuestionProgress.objects.filter(user_id=request.user.id, question_id=question.id).first()
+    answers = Answer.objects.filter(user_id=request.user.id, question_id=question.id)
+    answer_history_conditions = {}
+    if showing_answer_history:
+        past_answers, limit, page_offset, page_count, prev_cursor, next_cursor = get_list_page(
+            session=request.session,
+            params=params,
+            queryset=answers,
+            order_bys=['-created_at', '-id'],
+            limit_key_name='practice.views.view_answer_history_in_question__limit',
+            get_records_count=lambda: answer_progress.attempts if answer_progress else 0,
+        )
+        include_limit_exclude_offset_url = f"{reverse('practice:view_answer_history_in_question', args=[question.id])}?limit={limit}"
+        answer_history_conditions = {
+            "cursor_mode": bool(params.get('cursor', '')),
+            "prev_cursor_url": f"{include_limit_exclude_offset_url}&cursor={prev_cursor}" if prev_cursor else '',
+            "next_cursor_url": f"{include_limit_exclude_offset_url}&cursor={next_cursor}" if next_cursor else '',
+            "page_range": range(1, page_count + 1),
+            "page_offset": page_offset,
+            "limit": limit,
+            "include_limit_exclude_offset_url": include_limit_exclude_offset_url,
+        }
+    elif answer_progress:
+        # only the latest answers, the page does not grow with the number of attempts
+        past_answers = list(answers.order_by('-created_at', '-id')[:recent_answer_count])
+    else:
+        past_answers = []
 
     data = {
         'previous_adjacent_url': set_prev_adj_url(request),
@@ -1156,6 +1403,8 @@ def view_question(request, question_id, showing_comments: bool = False):
         "question_rating": '{:.2f}'.format(question_rating) if question_rating else '',
         "question_evaluation_count": question_evaluation_count,
         "past_answers": past_answers,
+        "answer_progress": answer_progress,
+        "answer_history_conditions": answer_history_conditions,
         "question_addition_image": question.get_addition_image(),
         "question_latex_image": question.get_latex_image(),
         "question_video": question.get_video(),
@@ -1189,25 +1438,32 @@ def view_question(request, question_id, showing_comments: bool = False):
             except (UnicodeDecodeError, ValueError):
                 pass
 
-        limit, page_offset, page_count, offset = get_limit_offset_count(
+        # only Normal comments are shown (comment_count counts them), state='Normal' is a prefix of practice_comment_timeline_idx
+        visible_comments = Comment.objects.filter(question_id=question.id, state='Normal').select_related('user')
+        # a cursor page is sought on the index whatever its depth
+        cursor = params.get('cursor', '')
+        comments, limit, page_offset, page_count, prev_cursor, next_cursor = get_list_page(
             session=request.session,
-            limit_in_params=params.get('limit', ''),
+            params=params,
+            queryset=visible_comments,
+            order_bys=['-created_at', '-id'],
             limit_key_name='practice.views.get_comments_in_question__limit',
-            offset_in_params=params.get('offset', ''),
-            records_count=question.comment_set.distinct().count()
+            get_records_count=lambda: question.comment_count,
         )
 
-        comments = question.comment_set.filter(~Q(state='Locked')).order_by('-created_at').distinct()[offset:(offset + limit)]
-
+        include_limit_exclude_offset_url = f"{reverse('practice:process_comments_in_question', args=[question.id])}?limit={limit}"
         context.update({
             "showing_comments": True,
             "comments": comments,
             "comment_conditions": {
+                "cursor_mode": bool(cursor),
+                "prev_cursor_url": f"{include_limit_exclude_offset_url}&cursor={prev_cursor}" if prev_cursor else '',
+                "next_cursor_url": f"{include_limit_exclude_offset_url}&cursor={next_cursor}" if next_cursor else '',
                 "page_range": range(1, page_count + 1),
                 "limits": [4, 8, 16],
                 "page_offset": page_offset,
                 "limit": limit,
-                "include_limit_exclude_offset_url": f"{reverse('practice:process_comments_in_question', args=[question.id])}?limit={limit}",
+                "include_limit_exclude_offset_url": include_limit_exclude_offset_url,
             }
         })
 
@@ -1217,15 +1473,42 @@ def view_question(request, question_id, showing_comments: bool = False):
 
 @ensure_is_not_anonymous_user
 @require_http_methods(['GET'])
+# the browser keeps the page but revalidates it with its ETag, an unchanged page is answered by 304
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=get_detail_question_etag)
 def view_detail_question(request, question_id):
     return view_question(request, question_id)
 
 
+@ensure_is_not_anonymous_user
+@require_http_methods(['GET'])
+def view_answer_history_in_question(request, question_id):
+    return view_question(request, question_id, showing_answer_history=True)
+
+
+@ensure_is_not_anonymous_user
+@require_http_methods(['GET', 'HEAD'])
+def view_question_media(request, name):
+    # a file is shared by the QuestionMedia of a same content, it is readable if one of their questions is visible
+    qms = QuestionMedia.objects.filter(file=name).select_related('question')
+    if request.user.role != 'Admin':
+        # same visibility as view_question
+        qms = qms.filter(Q(question__state='Approved') | Q(question__user_id=request.user.id))
+    qm = qms.first()
+    if qm is None:
+        return HttpResponseNotFound(_('<h1>Not Found</h1>'))
+
+    response = media.serve_file(request, path=qm.file.path, name=qm.file.name, content_type=media.get_content_type(qm.file.name, qm.media_type))
+    if response is None:
+        return HttpResponseNotFound(_('<h1>Not Found</h1>'))
+    return response
+
+
 @ensure_is_not_anonymous_user
 @require_http_methods(['GET'])
 def view_detail_answer(request, answer_id):
     if request.user.role != 'Admin':
-        answer = Answer.objects.filter(id=answer_id)
+        answer = Answer.objects.filter(id=answer_id).select_related('question')
         if not answer:
             return HttpResponseNotFound(_('<h1>Not Found</h1>'))
         answer = answer[0]
@@ -1249,6 +1532,8 @@ def view_detail_answer(request, answer_id):
 
 
 @ensure_is_not_anonymous_user
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=get_comments_in_question_etag)
 def process_comments_in_question(request, question_id):
     if request.method == 'GET':
         return view_question(request, question_id, showing_comments=True)
@@ -1495,25 +1780,25 @@ def process_new_comment_evaluation(request, comment_id):
 @ensure_is_admin
 @require_http_methods(['GET'])
 def view_pending_questions_by_admin(request):
-    return view_questions(request, path_name='practice:view_pending_questions_by_admin', filters=[Q(state='Pending')])
+    return view_questions(request, path_name='practice:view_pending_questions_by_admin', filters=get_question_list_filters(request.user, 'pending'))
 
 
 @ensure_is_admin
 @require_http_methods(['GET'])
 def view_locked_questions_by_admin(request):
-    return view_questions(request, path_name='practice:view_locked_questions_by_admin', filters=[Q(state='Locked')])
+    return view_questions(request, path_name='practice:view_locked_questions_by_admin', filters=get_question_list_filters(request.user, 'locked'))
 
 
 @ensure_is_admin
 @require_http_methods(['GET'])
 def view_unapproved_questions_by_admin(request):
-    return view_questions(request, path_name='practice:view_unapproved_questions_by_admin', filters=[Q(state='Unapproved')])
+    return view_questions(request, path_name='practice:view_unapproved_questions_by_admin', filters=get_question_list_filters(request.user, 'unapproved'))
 
 
 @ensure_is_admin
 @require_http_methods(['GET'])
 def view_approved_questions_by_admin(request):
-    return view_questions(request, path_name='practice:view_approved_questions_by_admin', filters=[Q(state='Approved')])
+    return view_questions(request, path_name='practice:view_approved_questions_by_admin', filters=get_question_list_filters(request.user, 'approved'))
 
 
 @ensure_is_admin
@@ -1534,7 +1819,7 @@ def process_question_by_admin(request, question_id):
     if action == 1:
         if question.state == 'Pending':
             question.state = 'Approved'
-            question.save()
+            question.save(update_fields=['state'])
             lg = Log(
                 model_name='Question',
                 object_id=question_id,
@@ -1550,7 +1835,7 @@ def process_question_by_admin(request, question_id):
     elif action == 2:
         if question.state == 'Pending':
             question.state = 'Unapproved'
-            question.save()
+            question.save(update_fields=['state'])
             lg = Log(
                 model_name='Question',
                 object_id=question_id,
@@ -1566,7 +1851,7 @@ def process_question_by_admin(request, question_id):
     elif action == 3:
         if question.state == 'Approved':
             question.state = 'Locked'
-            question.save()
+            question.save(update_fields=['state'])
             lg = Log(
                 model_name='Question',
                 object_id=question_id,
@@ -1582,7 +1867,7 @@ def process_question_by_admin(request, question_id):
     elif action == 4:
         if question.state == 'Locked':
             question.state = 'Approved'
-            question.save()
+            question.save(update_fields=['state'])
             lg = Log(
                 model_name='Question',
                 object_id=question_id,
@@ -1598,7 +1883,7 @@ def process_question_by_admin(request, question_id):
     elif action == 5:
         if question.state == 'Unapproved':
             question.state = 'Approved'
-            question.save()
+            question.save(update_fields=['state'])
             lg = Log(
                 model_name='Question',
                 object_id=question_id,
@@ -1643,8 +1928,9 @@ def view_evaluations_by_admin(request, path_name=None, filters=None, evaluation_
     author_codes = _filters_and_sorters['filter_by_author_code']
     if author_codes:
         author_codes = [author_code.strip() for author_code in author_codes.split(',') if author_code.strip()]
-        if author_codes:
-            filters.append(Q(user__code__iregex=r"^.*" + ('|'.join(author_codes)) + r".*$"))
+        user_ids = get_user_model().get_ids_by_codes(author_codes)
+        if user_ids is not None:
+            filters.append(Q(user_id__in=user_ids))
 
     if evaluation_type == 'comment':
         limit, page_offset, page_count, offset = get_limit_offset_count(
@@ -1652,7 +1938,7 @@ def view_evaluations_by_admin(request, path_name=None, filters=None, evaluation_
             limit_in_params=params.get('limit', ''),
             limit_key_name='practice.views.view_evaluations_by_admin__limit',
             offset_in_params=params.get('offset', ''),
-            records_count=CommentEvaluation.objects.filter(*filters).distinct().count()
+            records_count=count_cache.get_count(CommentEvaluation.objects.filter(*filters).distinct(), depends_on=(CommentEvaluation, get_user_model()))
         )
 
         evaluations = CommentEvaluation.objects.filter(*filters).order_by('-updated_at').distinct()[offset:(offset + limit)]
@@ -1662,7 +1948,7 @@ def view_evaluations_by_admin(request, path_name=None, filters=None, evaluation_
             limit_in_params=params.get('limit', ''),
             limit_key_name='practice.views.view_evaluations_by_admin__limit',
             offset_in_params=params.get('offset', ''),
-            records_count=QuestionEvaluation.objects.filter(*filters).exclude(content='').distinct().count()
+            records_count=count_cache.get_count(QuestionEvaluation.objects.filter(*filters).exclude(content='').distinct(), depends_on=(QuestionEvaluation, get_user_model()))
         )
 
         evaluations = QuestionEvaluation.objects.filter(*filters).order_by('-updated_at').exclude(content='').distinct()[offset:(offset + limit)]
@@ -1818,7 +2104,7 @@ def process_evaluation_by_admin(request, evaluation_id):
             if evaluation_type == 'question' and evaluation.state == 'Pending' and evaluation.question and evaluation.question.state != 'Locked':
                 q = evaluation.question
                 q.state = 'Locked'
-                q.save()
+                q.save(update_fields=['state'])
                 lg = Log(
                     model_name='Question',
                     object_id=q.id,
@@ -1866,15 +2152,16 @@ def view_comments_by_admin(request, path_name=None, filters=None):
 
     if filter_by_author_code:
         author_codes = [author_code.strip() for author_code in filter_by_author_code.split(',') if author_code.strip()]
-        if author_codes:
-            filters.append(Q(user__code__iregex=r"^.*" + ('|'.join(author_codes)) + r".*$"))
+        user_ids = get_user_model().get_ids_by_codes(author_codes)
+        if user_ids is not None:
+            filters.append(Q(user_id__in=user_ids))
 
     limit, page_offset, page_count, offset = get_limit_offset_count(
         session=request.session,
         limit_in_params=params.get('limit', ''),
         limit_key_name='practice.views.view_comments_by_admin__limit',
         offset_in_params=params.get('offset', ''),
-        records_count=Comment.objects.filter(*filters).distinct().count()
+        records_count=count_cache.get_count(Comment.objects.filter(*filters).distinct(), depends_on=(Comment, get_user_model()))
     )
 
     comments = Comment.objects.filter(*filters).order_by('-updated_at').distinct()[offset:(offset + limit)]
@@ -2010,21 +2297,23 @@ def view_users_by_admin(request, path_name=None, filters=None):
 
     if filter_by_name:
         names = [name.strip() for name in filter_by_name.split(',') if name.strip()]
-        if names:
-            filters.append(Q(name__iregex=r"^.*" + ('|'.join(names)) + r".*$"))
+        name_filter = get_user_model().get_name_filter(names)
+        if name_filter:
+            filters.append(name_filter)
 
     codes = _filters_and_sorters['filter_by_code']
     if codes:
         codes = [code.strip() for code in codes.split(',') if code.strip()]
-        if codes:
-            filters.append(Q(code__iregex=r"^.*" + ('|'.join(codes)) + r".*$"))
+        code_filter = get_user_model().get_code_filter(codes)
+        if code_filter:
+            filters.append(code_filter)
 
     limit, page_offset, page_count, offset = get_limit_offset_count(
         session=request.session,
         limit_in_params=params.get('limit', ''),
         limit_key_name='practice.views.view_users_by_admin__limit',
         offset_in_params=params.get('offset', ''),
-        records_count=get_user_model().objects.filter(*filters).exclude(role='Admin').distinct().count()
+        records_count=count_cache.get_count(get_user_model().objects.filter(*filters).exclude(role='Admin').distinct(), depends_on=(get_user_model(),))
     )
 
     users = get_user_model().objects.filter(*filters).exclude(role='Admin').order_by('-updated_at').distinct()[offset:(offset + limit)]
@@ -2151,7 +2440,7 @@ def process_question_tags_by_admin(request):
             limit_in_params=params.get('limit', ''),
             limit_key_name='',
             offset_in_params=offset_in_params,
-            records_count=QuestionTag.objects.filter(**kfilter).distinct().count()
+            records_count=count_cache.get_count(QuestionTag.objects.filter(**kfilter).distinct(), depends_on=(QuestionTag,))
         )
 
         data_in_params = params.get('data')
@@ -2229,3 +2518,112 @@ def process_question_tags_by_admin(request):
 
     else:
         return HttpResponseNotAllowed(['GET', 'POST'])
+
+
+# ========================================== API ====================================================
+question_filter_and_sorter_names = (
+    'filter_by_created_at_from',
+    'filter_by_created_at_to',
+    'filter_by_content',
+    'filter_by_hashtag',
+    'filter_by_author_code',
+    'sorter_with_created_at',
+    'sorter_with_decreasing_number_of_answers',
+    'sorter_with_decreasing_number_of_comments',
+)
+
+
+def serialize_question(question, cursor: str):
+    # the choices are not listed, they tell which choices are true
+    return {
+        'id': question.id,
+        'content': question.content,
+        'state': question.state,
+        'tag': {'id': question.tag.id, 'name': question.tag.name},
+        'author_code': question.user.code,
+        'hashtags': [hashtag.name for hashtag in question.hashtag_set.all()],
+        'answer_count': question.answer_count,
+        'comment_count': question.comment_count,
+        'created_at': question.created_at.isoformat(),
+        'cursor': cursor,
+    }
+
+
+@ensure_is_not_anonymous_user
+@require_http_methods(['GET'])
+def api_view_questions(request):
+    """
+    Read-only list of questions, nothing is kept in the session. Query parameters:
+        list: 'unanswered' (default), 'answered', 'created' or, for admins, 'pending', 'locked', 'unapproved', 'approved'
+        tid, filter_by_..., sorter_with_...: as in the filter form of questions.html
+        limit: number of questions, 100 by default, at most PRACTICE_API_MAX_LIMIT
+        cursor: the 'cursor' of the last question received, to get the following ones (the sorters must not change)
+        format: 'json' (default): {"questions": [...], "next_cursor": "..." or ""}
+                'ndjson': one question per line
+    The questions are streamed while they are read from the database, chunk by chunk.
+    """
+    params = request.GET
+
+    list_name = params.get('list', 'unanswered')
+    if list_name in admin_question_list_states:
+        if request.user.role != 'Admin':
+            return JsonResponse({'error': 'Bạn không có quyền xem danh sách này.'}, status=403)
+    elif list_name not in ('created', 'answered', 'unanswered'):
+        return JsonResponse({'error': 'Danh sách không hợp lệ.'}, status=400)
+
+    response_format = params.get('format', 'json')
+    if response_format not in ('json', 'ndjson'):
+        return JsonResponse({'error': 'Định dạng không hợp lệ.'}, status=400)
+
+    filters_and_sorters = {name: params.get(name, '') for name in question_filter_and_sorter_names}
+    for name in ('sorter_with_decreasing_number_of_answers', 'sorter_with_decreasing_number_of_comments'):
+        filters_and_sorters[name] = filters_and_sorters[name] not in ('', '0', 'false')
+
+    filters = get_question_list_filters(request.user, list_name)
+    tag_id = convert_to_int(string=params.get('tid', ''), default=-1)
+    if tag_id != -1:
+        filters.append(Q(tag_id=tag_id))
+    try:
+        filters.extend(get_question_filters(filters_and_sorters))
+    except ValueError:
+        return JsonResponse({'error': 'Thời điểm tạo không hợp lệ.'}, status=400)
+    order_bys = get_question_order_bys(filters_and_sorters)
+
+    queryset = annotate_question_search_rank(Question.objects.filter(*filters), filters_and_sorters)
+    cursor = params.get('cursor', '')
+    if cursor:
+        decoded_cursor = decode_cursor(cursor, order_bys, queryset)
+        if not decoded_cursor or decoded_cursor[1] != 'next':
+            return JsonResponse({'error': 'Con trỏ không hợp lệ.'}, status=400)
+        queryset = queryset.filter(get_keyset_filter(order_bys, decoded_cursor[0]))
+
+    max_limit = getattr(settings, 'PRACTICE_API_MAX_LIMIT', 10000)
+    limit = min(convert_to_non_negative_int(string=params.get('limit', ''), default=100) or 100, max_limit)
+    # one more question tells whether there is a next page
+    questions = load_question_cards(queryset.order_by(*order_bys).distinct())[:limit + 1].iterator(chunk_size=500)
+
+    has_next = False
+
+    def stream_questions():
+        nonlocal has_next
+        for i, question in enumerate(questions):
+            if i == limit:
+                has_next = True
+                return
+            yield serialize_question(question, encode_cursor(order_bys, question, 'next'))
+
+    def stream_ndjson():
+        for row in stream_questions():
+            yield json.dumps(row, ensure_ascii=False) + '\n'
+
+    def stream_json():
+        yield '{"questions": ['
+        last_row = None
+        for row in stream_questions():
+            yield (',' if last_row else '') + json.dumps(row, ensure_ascii=False)
+            last_row = row
+        yield f'], "next_cursor": {json.dumps(last_row["cursor"] if has_next else "")}}}'
+
+    if response_format == 'ndjson':
+        return StreamingHttpResponse(stream_ndjson(), content_type='application/x-ndjson; charset=utf-8')
+    return StreamingHttpResponse(stream_json(), content_type='application/json; charset=utf-8')
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from users.models import User, normalize_text
+
+
+class Command(BaseCommand):
+    help = 'Tính normalized_name và normalized_code cho các người dùng hiện có.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        count = 0
+
+        batch = []
+        for user in User.objects.order_by('id').only('id', 'name', 'code').iterator(chunk_size=batch_size):
+            user.normalized_name = normalize_text(user.name)
+            user.normalized_code = normalize_text(user.code.lstrip('#'))
+            batch.append(user)
+            if len(batch) >= batch_size:
+                count += self.backfill(batch)
+                batch = []
+        if batch:
+            count += self.backfill(batch)
+
+        self.stdout.write(self.style.SUCCESS(f'Đã chuẩn hoá họ và tên, mã của {count} người dùng.'))
+
+    @staticmethod
+    def backfill(batch):
+        with transaction.atomic():
+            User.objects.bulk_update(batch, ['normalized_name', 'normalized_code'])
+        return len(batch)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.templatetags.static import static
 from django.utils import timezone
 from django.http.response import HttpResponse
@@ -48,7 +49,8 @@ class TimezoneMiddleware:
         else:
             timezone.activate(datetime.timezone.utc)
         response = self.get_response(request)
-        if isinstance(response, HttpResponse):
+        # a 304 has neither content nor Content-Type
+        if isinstance(response, HttpResponse) and response.status_code != 304:
             contenttype = response.headers.get('Content-Type')
             if not contenttype:
                 contenttype = response.headers.get('content-type')
@@ -61,6 +63,7 @@ class TimezoneMiddleware:
             if 'text/html' in contenttype:
                 response.content = (f'<script src={static("users/js/tz_sub_utc_minutes.js")}>'
                                     f'</script>').encode() + response.content
-                # browser must not store html
-                response.headers['Cache-Control'] = 'no-store'
+                # browser must not store html, unless the view has its own policy (e.g. pages revalidated by ETag)
+                if not response.has_header('Cache-Control'):
+                    response.headers['Cache-Control'] = getattr(settings, 'HTML_CACHE_CONTROL', 'no-store')
         return response
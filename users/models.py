@@ -1,12 +1,44 @@
 import datetime
+import unicodedata
 from hashlib import shake_128
 from random import randint
 
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import BaseUserManager, AbstractBaseUser
 from django.utils.translation import gettext_lazy as _
 
 
+def normalize_text(text: str):
+    # lower case and fold Vietnamese diacritics: 'Đường thẳng' -> 'duong thang'
+    text = (text or '').replace('đ', 'd').replace('Đ', 'D')
+    text = ''.join(c for c in unicodedata.normalize('NFD', text) if not unicodedata.combining(c))
+    return unicodedata.normalize('NFC', text).lower()
+
+
+def get_exact_or_prefix_filter(field_name, keywords):
+    """
+    field_name: a column holding normalize_text of a value
+    Returns a Q matching one of the keywords, or None if there is no keyword,
+    'abc' matches abc exactly, 'abc*' matches values starting with abc (case and accent insensitive).
+    """
+    conditions = []
+    for keyword in keywords:
+        if keyword.endswith('*'):
+            prefix = normalize_text(keyword.rstrip('*'))
+            if prefix:
+                # a range instead of LIKE so that the index is used whatever the collation is
+                conditions.append(Q(**{f'{field_name}__gte': prefix, f'{field_name}__lt': prefix + '\U0010ffff'}))
+        elif keyword:
+            conditions.append(Q(**{field_name: normalize_text(keyword)}))
+    if not conditions:
+        return None
+    condition = conditions[0]
+    for c in conditions[1:]:
+        condition |= c
+    return condition
+
+
 def generate_code(email):
     m = shake_128(f'{email}{randint(0, 999999)}{datetime.datetime.now(datetime.timezone.utc)}'.encode('utf-8'))
     code = f"#{m.hexdigest(3)}"
@@ -65,6 +97,9 @@ class UserManager(BaseUserManager):
 class User(AbstractBaseUser):
     name = models.CharField(_('họ và tên'), max_length=255, )
     code = models.CharField(_('mã'), max_length=15, unique=True, )
+    # normalize_text of name and of code without '#', exact and prefix lookups use their indexes
+    normalized_name = models.CharField(_('họ và tên đã chuẩn hoá'), max_length=255, db_index=True, default='', )
+    normalized_code = models.CharField(_('mã đã chuẩn hoá'), max_length=15, db_index=True, default='', )
     email = models.EmailField(_('email'), max_length=255, unique=True, )
     updated_at = models.DateTimeField(_('thời điểm cập nhật gần nhất'), )
     STATE_CHOICES = (
@@ -87,6 +122,36 @@ class User(AbstractBaseUser):
     def __str__(self):
         return self.email
 
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_text(self.name)
+        self.normalized_code = normalize_text(self.code.lstrip('#'))
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'normalized_name', 'normalized_code'}
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def get_name_filter(names):
+        """
+        Returns a Q on User matching one of the names ('nguyen van a' or 'nguyen*'), or None if there is no name.
+        """
+        return get_exact_or_prefix_filter('normalized_name', [name.strip() for name in names])
+
+    @staticmethod
+    def get_code_filter(codes):
+        """
+        Returns a Q on User matching one of the codes ('#a1b2c3', 'a1b2c3' or 'a1*'), or None if there is no code.
+        """
+        return get_exact_or_prefix_filter('normalized_code', [code.strip().lstrip('#') for code in codes])
+
+    @staticmethod
+    def get_ids_by_codes(codes):
+        """
+        Returns a subquery of the ids of the users matching one of the codes, to filter their records by user_id__in,
+        or None if there is no code.
+        """
+        code_filter = User.get_code_filter(codes)
+        return User.objects.filter(code_filter).values('id') if code_filter else None
+
     def has_perm(self, perm, obj=None):
         """Does the user have a specific permission?
         Simplest possible answer: Yes, always"""